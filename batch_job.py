@@ -0,0 +1,384 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterator, List, Literal, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from loan_portfolio import run_portfolio_calculator
+
+MANIFEST_NAME = "_manifest.json"
+LOAN_COLUMNS = [
+    "loan_id",
+    "amount",
+    "taeg",
+    "number_repayments",
+    "start_date",
+    "days_first_repayment",
+]
+
+
+def list_partitions(input_dir: Path) -> List[Path]:
+    """List the csv and parquet partitions of an input directory, sorted by name."""
+    return sorted(
+        p
+        for p in Path(input_dir).iterdir()
+        if p.suffix in (".csv", ".parquet") and not p.name.startswith((".", "_"))
+    )
+
+
+def read_loans(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Read the loans of a partition by chunks of at most chunk_size rows.
+
+    An empty partition gives one empty chunk.
+    """
+    if path.suffix == ".parquet":
+        parquet_file = pq.ParquetFile(path)
+        if parquet_file.metadata.num_rows == 0:
+            yield parquet_file.schema_arrow.empty_table().to_pandas()[LOAN_COLUMNS]
+        for batch in parquet_file.iter_batches(
+            batch_size=chunk_size, columns=LOAN_COLUMNS
+        ):
+            yield batch.to_pandas()
+    else:
+        empty = True
+        for loans in pd.read_csv(
+            path, usecols=LOAN_COLUMNS, dtype={"loan_id": str}, chunksize=chunk_size
+        ):
+            empty = False
+            yield loans
+        if empty:
+            yield pd.read_csv(path, usecols=LOAN_COLUMNS, dtype={"loan_id": str})
+
+
+def count_loans(path: Path, block_size: int = 1 << 20) -> int:
+    """Count the loans of a partition, from the parquet metadata or the csv lines.
+
+    Unreadable parquet files count as empty, they fail when computed.
+    """
+    if path.suffix == ".parquet":
+        try:
+            return pq.ParquetFile(path).metadata.num_rows
+        except pa.ArrowException:
+            return 0
+    n_lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            n_lines += block.count(b"\n")
+            last = block[-1:]
+    return max(n_lines + (last != b"\n") - 1, 0)
+
+
+def parse_loans(loans: pd.DataFrame) -> dict:
+    """Parse the parameters of a chunk of loans for ``run_portfolio_calculator``.
+
+    Malformed values are parsed as invalid parameters (NaN, NaT or 0), so that
+    their loans are dropped instead of failing the whole chunk.
+    """
+    parameters = {
+        name: pd.to_numeric(loans[name], errors="coerce")
+        .fillna(0)
+        .to_numpy(dtype=np.int64)
+        for name in ("amount", "number_repayments", "days_first_repayment")
+    }
+    parameters["taeg"] = pd.to_numeric(loans["taeg"], errors="coerce").to_numpy(
+        dtype=np.float64
+    )
+    parameters["start_date"] = pd.to_datetime(
+        loans["start_date"], errors="coerce", format="ISO8601"
+    ).to_numpy(dtype="datetime64[D]")
+    return parameters
+
+
+def output_name(name: str) -> str:
+    """Name of the output partition of an input partition."""
+    return f"{name}.parquet"
+
+
+def compute_partition(
+    path: Path,
+    output_path: Path,
+    chunk_size: int,
+    as_interests_or_base_fees: Literal["interests", "base_fees"],
+    progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """Compute the schedules of the loans of a partition into a parquet file.
+
+    The file is written under a temporary name and renamed once complete, so
+    that output partitions are either missing or complete. ``progress`` is
+    called after each chunk with its numbers of loans and schedule rows.
+
+    Returns
+    -------
+    dict
+        Number of loans read, loans dropped as invalid and schedule rows written.
+    """
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    stats = {"loans": 0, "dropped": 0, "rows": 0}
+    writer = None
+    try:
+        for loans in read_loans(path, chunk_size):
+            loan_id = loans["loan_id"]
+            if not pd.api.types.is_numeric_dtype(loan_id):
+                # typed as string even when empty, for a stable output schema
+                loan_id = loan_id.to_numpy(dtype=str)
+            schedule = run_portfolio_calculator(
+                **parse_loans(loans),
+                as_interests_or_base_fees=as_interests_or_base_fees,
+                loan_id=loan_id,
+                errors="drop",
+            )
+            table = schedule.to_arrow()
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            stats["loans"] += len(loans)
+            stats["dropped"] += len(loans) - (len(schedule.offsets) - 1)
+            stats["rows"] += len(schedule)
+            if progress is not None:
+                progress({"loans": len(loans), "rows": len(schedule)})
+        writer.close()
+        writer = None
+        os.replace(tmp_path, output_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        tmp_path.unlink(missing_ok=True)
+    return stats
+
+
+class ChunkReporter:
+    """Picklable progress callback of a worker, putting chunks in a queue."""
+
+    def __init__(self, chunks, partition: str):
+        self.chunks = chunks
+        self.partition = partition
+
+    def __call__(self, chunk: dict):
+        self.chunks.put((self.partition, chunk))
+
+
+def load_manifest(output_dir: Path) -> dict:
+    """Load the checkpoint manifest of an output directory, empty if missing."""
+    path = Path(output_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {"partitions": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(output_dir: Path, manifest: dict):
+    """Atomically write the checkpoint manifest of an output directory."""
+    path = Path(output_dir) / MANIFEST_NAME
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def partition_signature(path: Path) -> dict:
+    """Size and modification time of an input partition, to detect changes."""
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def run_batch_job(
+    input_dir: Path,
+    output_dir: Path,
+    workers: Optional[int] = None,
+    chunk_size: int = 100_000,
+    as_interests_or_base_fees: Literal["interests", "base_fees"] = "interests",
+    log=print,
+) -> dict:
+    """Compute the repayment schedules of all loans of partitioned input files.
+
+    Each input partition (csv or parquet file with the ``LOAN_COLUMNS``) gives
+    one parquet output partition, named after it with ``.parquet`` appended.
+    Finished partitions are recorded in a manifest in the output directory, so
+    that a restarted job skips them and resumes with the others. Partitions
+    which fail are logged and left out of the manifest, to be computed again
+    by the next run.
+
+    Progress is logged after each chunk, with rows and loans per second and an
+    estimate of the remaining time from the number of loans left.
+
+    Parameters
+    ----------
+    input_dir : Path
+        Directory of the input partitions.
+    output_dir : Path
+        Directory of the output partitions and of the manifest.
+    workers : int, optional
+        Number of worker processes, by default the number of CPUs. With 1
+        worker, partitions are computed in the current process.
+    chunk_size : int, optional
+        Number of loans computed at once by a worker, by default 100000
+    as_interests_or_base_fees : Literal['interests', 'base_fees'], optional
+        Schedules as interests or base fees, by default 'interests'
+    log : callable, optional
+        Progress logger, by default print
+
+    Returns
+    -------
+    dict
+        Manifest of the job.
+    """
+    input_dir, output_dir = Path(input_dir), Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    if manifest.get("as_interests_or_base_fees", as_interests_or_base_fees) != (
+        as_interests_or_base_fees
+    ):
+        raise ValueError(
+            "The output directory holds schedules computed with another mode."
+        )
+    manifest["as_interests_or_base_fees"] = as_interests_or_base_fees
+    done = manifest["partitions"]
+
+    todo = []
+    for path in list_partitions(input_dir):
+        output_path = output_dir / output_name(path.name)
+        entry = done.get(path.name)
+        if (
+            entry is not None
+            and entry["input"] == partition_signature(path)
+            and output_path.exists()
+        ):
+            continue
+        done.pop(path.name, None)
+        todo.append((path, output_path, partition_signature(path)))
+    log(f"{len(todo)} partitions to compute, {len(done)} already done")
+
+    total_loans = sum(count_loans(path) for path, _, _ in todo)
+    done_loans = done_rows = 0
+    failed = []
+    start = time.monotonic()
+
+    def report(partition: str, chunk: dict):
+        nonlocal done_loans, done_rows
+        done_loans += chunk["loans"]
+        done_rows += chunk["rows"]
+        elapsed = max(time.monotonic() - start, 1e-9)
+        eta = elapsed * max(total_loans - done_loans, 0) / max(done_loans, 1)
+        log(
+            f"{partition}: {done_loans} / {total_loans} loans, "
+            f"{done_rows / elapsed:.0f} rows/s, {done_loans / elapsed:.0f} loans/s, "
+            f"ETA {eta:.0f}s"
+        )
+
+    def checkpoint(path: Path, signature: dict, stats: dict):
+        done[path.name] = {"input": signature, **stats}
+        write_manifest(output_dir, manifest)
+        elapsed = max(time.monotonic() - start, 1e-9)
+        eta = elapsed * max(total_loans - done_loans, 0) / max(done_loans, 1)
+        log(
+            f"{path.name}: done, {stats['loans']} loans, {stats['dropped']} dropped - "
+            f"{len(done)} partitions done, ETA {eta:.0f}s"
+        )
+
+    def fail(path: Path, error: Exception):
+        failed.append(path.name)
+        log(f"{path.name}: failed, {type(error).__name__}: {error}")
+
+    if workers == 1:
+        for path, output_path, signature in todo:
+            try:
+                stats = compute_partition(
+                    path,
+                    output_path,
+                    chunk_size,
+                    as_interests_or_base_fees,
+                    lambda chunk, name=path.name: report(name, chunk),
+                )
+            except Exception as e:
+                fail(path, e)
+                continue
+            checkpoint(path, signature, stats)
+    else:
+        # workers report their chunks through a queue, read between completions
+        with (
+            multiprocessing.Manager() as manager,
+            ProcessPoolExecutor(max_workers=workers) as executor,
+        ):
+            chunks = manager.Queue()
+
+            def read_chunks():
+                while True:
+                    try:
+                        report(*chunks.get_nowait())
+                    except queue.Empty:
+                        return
+
+            futures = {
+                executor.submit(
+                    compute_partition,
+                    path,
+                    output_path,
+                    chunk_size,
+                    as_interests_or_base_fees,
+                    ChunkReporter(chunks, path.name),
+                ): (path, signature)
+                for path, output_path, signature in todo
+            }
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(
+                    pending, timeout=1, return_when=FIRST_COMPLETED
+                )
+                read_chunks()
+                for future in finished:
+                    path, signature = futures[future]
+                    try:
+                        stats = future.result()
+                    except Exception as e:
+                        fail(path, e)
+                        continue
+                    checkpoint(path, signature, stats)
+
+    if failed:
+        log(f"{len(failed)} partitions failed: {', '.join(failed)}")
+    return manifest
+
+
+def read_schedules(output_dir: Path) -> pa.Table:
+    """Read the output partitions recorded in the manifest as one table."""
+    manifest = load_manifest(output_dir)
+    return pa.concat_tables(
+        pq.read_table(Path(output_dir) / output_name(name))
+        for name in sorted(manifest["partitions"])
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compute the repayment schedules of partitioned loan files."
+    )
+    parser.add_argument("input_dir", type=Path)
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument(
+        "--as-interests-or-base-fees",
+        choices=["interests", "base_fees"],
+        default="interests",
+    )
+    args = parser.parse_args()
+
+    run_batch_job(
+        args.input_dir,
+        args.output_dir,
+        args.workers,
+        args.chunk_size,
+        args.as_interests_or_base_fees,
+    )
@@ -0,0 +1,100 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+from itertools import repeat
+from typing import Iterable, List, Literal, NamedTuple, Optional, Sequence, Tuple
+
+from loan_calculator import TooHighInterestsError, run_loan_calculator
+
+
+class FrozenRepayment(NamedTuple):
+    """Immutable repayment schedule item, with the fields of ``Repayment``"""
+
+    date: date
+    amount_repayment: int
+    amount_principal: int
+    amount_interests: int
+    amount_base_fees: int
+    amount_remaining_principal: int
+
+
+Schedule = Tuple[FrozenRepayment, ...]
+
+
+def run_loan_calculator_batch(
+    loans: Iterable[Sequence],
+    workers: Optional[int] = None,
+    executor: Literal["threads", "processes"] = "threads",
+    chunk_size: int = 256,
+    errors: Literal["raise", "drop"] = "raise",
+) -> List[Optional[Schedule]]:
+    """Compute the repayment schedules of a batch of loans with a pool of workers.
+
+    Loans are computed by chunks, each by one worker, with ``run_loan_calculator``.
+    Threads only run Python code in parallel on free-threaded builds of CPython
+    3.13+; with the GIL, loans are computed in the calling thread by default.
+
+    Schedules are tuples of immutable repayments, so results can be cached and
+    shared between threads.
+
+    Parameters
+    ----------
+    loans : Iterable[Sequence]
+        Positional arguments of ``run_loan_calculator`` of each loan, from the
+        amount to optionally ``as_interests_or_base_fees``.
+    workers : int, optional
+        Number of threads or processes, by default the number of CPUs, or 1
+        for threads when the GIL is enabled. With 1, loans are computed in the
+        calling thread.
+    executor : Literal['threads', 'processes'], optional
+        Pool of workers, by default 'threads'
+    chunk_size : int, optional
+        Number of loans given at once to a worker, by default 256
+    errors : Literal['raise', 'drop'], optional
+        If 'drop', invalid loans get None instead of raising, by default 'raise'
+
+    Returns
+    -------
+    List[Optional[Schedule]]
+        Repayment schedules, in the order of the loans.
+    """
+    loans = list(loans)
+    chunks = [loans[i : i + chunk_size] for i in range(0, len(loans), chunk_size)]
+    if workers is None:
+        workers = (
+            1 if executor == "threads" and gil_enabled() else (os.cpu_count() or 1)
+        )
+
+    if workers == 1:
+        results = list(map(compute_chunk, chunks, repeat(errors)))
+    else:
+        pool_class = (
+            ThreadPoolExecutor if executor == "threads" else ProcessPoolExecutor
+        )
+        with pool_class(workers) as pool:
+            results = list(pool.map(compute_chunk, chunks, repeat(errors)))
+    return [schedule for chunk in results for schedule in chunk]
+
+
+def compute_chunk(
+    loans: List[Sequence], errors: Literal["raise", "drop"]
+) -> List[Optional[Schedule]]:
+    """Compute the repayment schedules of a chunk of loans."""
+    schedules = []
+    for loan in loans:
+        try:
+            schedules.append(
+                tuple(FrozenRepayment(**vars(r)) for r in run_loan_calculator(*loan))
+            )
+        except (ValueError, TooHighInterestsError):
+            if errors == "raise":
+                raise
+            schedules.append(None)
+    return schedules
+
+
+def gil_enabled() -> bool:
+    """Whether the GIL is enabled, as always before CPython 3.13."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is None or is_gil_enabled()
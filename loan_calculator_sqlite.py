@@ -0,0 +1,121 @@
+import sqlite3
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+
+from batch_job import LOAN_COLUMNS, parse_loans
+from loan_calculator import LoanCalculator, TooHighInterestsError
+from loan_portfolio import AMOUNT_COLUMNS, run_portfolio_calculator
+
+
+def create_loan_calculator_table(
+    conn: sqlite3.Connection,
+    query: str,
+    parameters=(),
+    table: str = "loan_calculator",
+    batch_size: int = 100_000,
+    rowwise: bool = False,
+    errors: Literal["raise", "drop"] = "raise",
+) -> int:
+    """Evaluate the loan calculator table function over the rows of a query.
+
+    Local stand-in for the ``loan_calculator`` UDTF of ``udfs/loan_calculator.sql``:
+    sqlite3 cannot register table-valued functions, so the schedules of all
+    loans returned by ``query`` are materialized into a temporary table, to be
+    joined with the loans on ``loan_id``.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Database connection.
+    query : str
+        Query returning ``loan_id`` then the arguments of the UDTF: ``amount``,
+        ``taeg``, ``number_repayments``, ``start_date`` (ISO date),
+        ``days_first_repayment`` and ``as_interests_or_base_fees``.
+    parameters : optional
+        Parameters of the query, by default none.
+    table : str, optional
+        Name of the temporary table, replaced if it exists, by default 'loan_calculator'
+    batch_size : int, optional
+        Number of loans fetched and computed at once, by default 100000
+    rowwise : bool, optional
+        If True, call the UDTF handler once per loan like the database would,
+        instead of computing batches with ``run_portfolio_calculator``, by default False
+    errors : Literal['raise', 'drop'], optional
+        If 'drop', loans with invalid parameters or too high interests have no
+        schedule instead of raising, by default 'raise'
+
+    Returns
+    -------
+    int
+        Number of schedule rows inserted.
+    """
+    conn.execute(f"drop table if exists temp.{table}")
+    conn.execute(
+        f"create temp table {table} (loan_id, date text, "
+        + ", ".join(f"{c} integer" for c in AMOUNT_COLUMNS)
+        + ")"
+    )
+    insert = f"insert into temp.{table} values ({', '.join('?' * 7)})"
+    n_rows = 0
+    cursor = conn.execute(query, parameters)
+    while loans := cursor.fetchmany(batch_size):
+        rows = (
+            evaluate_rowwise(loans, errors)
+            if rowwise
+            else evaluate_batch(loans, errors)
+        )
+        n_rows += len(rows)
+        conn.executemany(insert, rows)
+    return n_rows
+
+
+def evaluate_batch(loans: list, errors: Literal["raise", "drop"]) -> list:
+    """Compute the schedule rows of a batch of loans with the portfolio calculator."""
+    columns = list(zip(*loans))
+    loan_id, modes = (np.array(c, dtype=object) for c in (columns[0], columns[6]))
+    # malformed or NULL values are parsed as invalid, like in batch jobs
+    parameters = parse_loans(
+        pd.DataFrame(dict(zip(LOAN_COLUMNS[1:], columns[1:6])), dtype=object)
+    )
+    # modes may be NULL, loans of invalid modes have no schedule
+    if errors == "raise" and not np.isin(modes, ["interests", "base_fees"]).all():
+        raise ValueError(
+            "The repayment schedule must be either as interests or base fees."
+        )
+    rows = []
+    for mode in ("base_fees", "interests"):
+        selected = modes == mode
+        if not selected.any():
+            continue
+        schedule = run_portfolio_calculator(
+            **{name: values[selected] for name, values in parameters.items()},
+            as_interests_or_base_fees=mode,
+            loan_id=loan_id[selected],
+            errors=errors,
+        )
+        rows.extend(
+            zip(
+                schedule.loan_id.tolist(),
+                np.datetime_as_string(schedule.date).tolist(),
+                *(getattr(schedule, c).tolist() for c in AMOUNT_COLUMNS),
+            )
+        )
+    return rows
+
+
+def evaluate_rowwise(loans: list, errors: Literal["raise", "drop"]) -> list:
+    """Compute the schedule rows of a batch of loans one loan at a time."""
+    handler = LoanCalculator()
+    rows = []
+    for loan_id, *arguments in loans:
+        try:
+            schedule = handler.process(*arguments)
+        except (ValueError, TypeError, TooHighInterestsError):
+            # NULL numbers raise a TypeError in the comparisons of validate_inputs
+            if errors == "raise":
+                raise
+            continue
+        rows.extend((loan_id, d.isoformat(), *amounts) for d, *amounts in schedule)
+    return rows
@@ -0,0 +1,472 @@
+import sys
+from dataclasses import dataclass, replace
+from typing import List, Literal, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from loan_calculator import TooHighInterestsError
+
+AMOUNT_COLUMNS = (
+    "amount_repayment",
+    "amount_principal",
+    "amount_interests",
+    "amount_base_fees",
+    "amount_remaining_principal",
+)
+# 100 years of monthly repayments, to bound the size of the padded arrays
+MAX_NUMBER_REPAYMENTS = 1200
+
+
+@dataclass
+class PortfolioSchedule:
+    """Columnar repayment schedule of one or several loans.
+
+    Rows are grouped by loan, in input order, then sorted by date. The rows of
+    the i-th loan are ``offsets[i]:offsets[i + 1]``.
+    """
+
+    loan_id: np.ndarray
+    date: np.ndarray
+    amount_repayment: np.ndarray
+    amount_principal: np.ndarray
+    amount_interests: np.ndarray
+    amount_base_fees: np.ndarray
+    amount_remaining_principal: np.ndarray
+    offsets: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def padded(self, values: np.ndarray, fill=0) -> np.ndarray:
+        """Reshape a column to one row per loan, padded with fill after its last
+        repayment, of shape (number of loans, max number of repayments)."""
+        counts = np.diff(self.offsets)
+        mask = np.arange(counts.max(initial=0)) < counts[:, None]
+        padded = np.full(mask.shape, fill, dtype=values.dtype)
+        padded[mask] = values
+        return padded
+
+    def columns(self, in_euros: bool = False, short_names: bool = False) -> dict:
+        """Return the schedule as a mapping of column name to array.
+
+        Parameters
+        ----------
+        in_euros : bool, optional
+            If True, amounts are converted from cents to euros as float64, by default False
+        short_names : bool, optional
+            If True, drop the 'amount_' prefix of amount columns, by default False
+
+        Returns
+        -------
+        dict
+            Column name to numpy array, in schedule order.
+        """
+        columns = {"loan_id": self.loan_id, "date": self.date}
+        for name in AMOUNT_COLUMNS:
+            values = getattr(self, name)
+            if in_euros:
+                values = values / 100
+            columns[name.replace("amount_", "") if short_names else name] = values
+        return columns
+
+    def to_pandas(
+        self, in_euros: bool = False, short_names: bool = False
+    ) -> pd.DataFrame:
+        """Return the schedule as a pandas DataFrame, see ``columns`` for parameters."""
+        return pd.DataFrame(self.columns(in_euros, short_names), copy=False)
+
+    def to_arrow(self, in_euros: bool = False, short_names: bool = False) -> pa.Table:
+        """Return the schedule as a pyarrow Table, see ``columns`` for parameters."""
+        return pa.table(
+            {
+                name: pa.array(values, type=pa.date32()) if name == "date" else values
+                for name, values in self.columns(in_euros, short_names).items()
+            }
+        )
+
+
+def run_portfolio_calculator(
+    amount,
+    taeg,
+    number_repayments,
+    start_date,
+    days_first_repayment=45,
+    as_interests_or_base_fees: Literal["interests", "base_fees"] = "interests",
+    loan_id=None,
+    errors: Literal["raise", "drop"] = "raise",
+) -> PortfolioSchedule:
+    """Compute the repayment schedules of many loans at once.
+
+    Parameters are the ones of ``run_loan_calculator``, given as scalars or
+    array-likes broadcast against each other. Schedules are identical to the
+    ones of ``run_loan_calculator``, to the cent, for at most
+    ``MAX_NUMBER_REPAYMENTS`` repayments.
+
+    Loans are computed by groups of similar numbers of repayments, so that a
+    few long loans do not pad the schedules of all others.
+
+    Parameters
+    ----------
+    amount : int or array-like
+        Principal amount of the loans in cents.
+    taeg : float or array-like
+        Annual percentage rate of charge, between 0 and 1.
+    number_repayments : int or array-like
+        Number of repayments in months.
+    start_date : date or array-like
+        Start date of the loans, as dates, ISO strings or datetime64.
+    days_first_repayment : int or array-like, optional
+        Number of days before the first repayment, by default 45
+    as_interests_or_base_fees : Literal['interests', 'base_fees'], optional
+        If 'base_fees', group all interests in the first repayments, which are considered as fees, by default 'interests'
+    loan_id : array-like, optional
+        Identifier of each loan, by default the position of the loan in the input.
+    errors : Literal['raise', 'drop'], optional
+        If 'drop', loans with invalid parameters or too high interests are left
+        out of the result instead of raising, by default 'raise'
+
+    Returns
+    -------
+    PortfolioSchedule
+        Repayment schedules of all loans.
+    """
+    amount, taeg, number_repayments, days_first_repayment = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(amount, dtype=np.int64)),
+        np.atleast_1d(np.asarray(taeg, dtype=np.float64)),
+        np.atleast_1d(np.asarray(number_repayments, dtype=np.int64)),
+        np.atleast_1d(np.asarray(days_first_repayment, dtype=np.int64)),
+    )
+    start_date = np.broadcast_to(
+        np.atleast_1d(np.asarray(start_date, dtype="datetime64[D]")), amount.shape
+    )
+    if loan_id is None:
+        loan_id = np.arange(len(amount))
+    loan_id = np.broadcast_to(np.atleast_1d(np.asarray(loan_id)), amount.shape)
+    if as_interests_or_base_fees not in ["interests", "base_fees"]:
+        raise ValueError(
+            "The repayment schedule must be either as interests or base fees."
+        )
+
+    valid = validate_portfolio_inputs(
+        amount,
+        taeg,
+        number_repayments,
+        start_date,
+        days_first_repayment,
+        raise_errors=errors == "raise",
+    )
+    if not valid.all():
+        amount, taeg, number_repayments, start_date, days_first_repayment, loan_id = (
+            a[valid]
+            for a in (
+                amount,
+                taeg,
+                number_repayments,
+                start_date,
+                days_first_repayment,
+                loan_id,
+            )
+        )
+
+    # loans are computed by groups of numbers of repayments within a factor 2,
+    # so that padded arrays stay close to the size of the schedules
+    position = np.arange(len(amount))
+    group = np.ceil(np.log2(np.maximum(number_repayments, 1))).astype(np.int64)
+    groups = [group == g for g in np.unique(group)] or [group == 0]
+    schedule = concat_schedules(
+        [
+            compute_schedules(
+                amount[g],
+                taeg[g],
+                number_repayments[g],
+                start_date[g],
+                days_first_repayment[g],
+                position[g],
+                errors,
+            )
+            for g in groups
+        ]
+    )
+
+    if as_interests_or_base_fees == "base_fees":
+        schedule = apply_portfolio_base_fees(
+            schedule, amount[schedule.loan_id[schedule.offsets[:-1]]]
+        )
+
+    return replace(schedule, loan_id=loan_id[schedule.loan_id])
+
+
+def compute_schedules(
+    amount: np.ndarray,
+    taeg: np.ndarray,
+    number_repayments: np.ndarray,
+    start_date: np.ndarray,
+    days_first_repayment: np.ndarray,
+    loan_id: np.ndarray,
+    errors: Literal["raise", "drop"],
+) -> PortfolioSchedule:
+    """Compute the schedules of valid loans as interests, on padded arrays of
+    shape (loans, largest number of repayments)."""
+    n_loans = len(amount)
+    n_max = int(number_repayments.max(initial=0))
+    mask = np.arange(n_max) < number_repayments[:, None]
+
+    # compute daily rate
+    daily_rate = python_pow(1 + taeg, 1, per=365) - 1
+
+    # compute constant amount repayment with respect to the daily rate
+    dates = add_months(start_date + days_first_repayment, np.arange(n_max))
+    days = (dates - start_date[:, None]).astype(np.int64)
+    rates = 1 / python_pow((1 + daily_rate)[:, None], days)
+    constant_payment = np.floor(amount / python_sum(rates, mask)).astype(np.int64)
+
+    # compute repayment schedule
+    n_days = np.diff(days, axis=1, prepend=0)
+    interval_rates = python_pow((1 + taeg)[:, None], n_days, per=365) - 1
+    interests = np.zeros((n_loans, n_max), dtype=np.int64)
+    principal = np.zeros((n_loans, n_max), dtype=np.int64)
+    remaining = np.zeros((n_loans, n_max), dtype=np.int64)
+    remaining_principal = amount.copy()
+    for k in range(n_max):
+        interests[:, k] = np.floor(remaining_principal * interval_rates[:, k])
+        principal[:, k] = constant_payment - interests[:, k]
+        remaining_principal = np.where(
+            mask[:, k], remaining_principal - principal[:, k], remaining_principal
+        )
+        remaining[:, k] = remaining_principal
+
+    too_high = (mask & (interests > constant_payment[:, None])).any(axis=1)
+    if too_high.any():
+        if errors == "raise":
+            raise TooHighInterestsError(
+                "The repayment is too low to cover the interests; please modify loan parameters."
+            )
+        keep = ~too_high
+        amount, number_repayments, loan_id, constant_payment, remaining_principal = (
+            a[keep]
+            for a in (
+                amount,
+                number_repayments,
+                loan_id,
+                constant_payment,
+                remaining_principal,
+            )
+        )
+        mask, dates, interests, principal, remaining = (
+            a[keep] for a in (mask, dates, interests, principal, remaining)
+        )
+        n_loans = len(amount)
+
+    repayment = np.broadcast_to(constant_payment[:, None], mask.shape).copy()
+
+    # adjust last repayment to match the remaining principal due to rounding issues
+    last = (np.arange(n_loans), number_repayments - 1)
+    repayment[last] += remaining_principal
+    principal[last] += remaining_principal
+    remaining[last] = 0
+
+    offsets = np.zeros(n_loans + 1, dtype=np.int64)
+    np.cumsum(number_repayments, out=offsets[1:])
+    return PortfolioSchedule(
+        loan_id=np.repeat(loan_id, number_repayments),
+        date=dates[mask],
+        amount_repayment=repayment[mask],
+        amount_principal=principal[mask],
+        amount_interests=interests[mask],
+        amount_base_fees=np.zeros(offsets[-1], dtype=np.int64),
+        amount_remaining_principal=remaining[mask],
+        offsets=offsets,
+    )
+
+
+def concat_schedules(schedules: List[PortfolioSchedule]) -> PortfolioSchedule:
+    """Concatenate schedules of loans identified by position, in order of position."""
+    if len(schedules) == 1:
+        return schedules[0]
+    position = np.concatenate([s.loan_id[s.offsets[:-1]] for s in schedules])
+    shifts = np.cumsum([0] + [len(s) for s in schedules])
+    starts = np.concatenate([s.offsets[:-1] + n for s, n in zip(schedules, shifts)])
+    counts = np.concatenate([np.diff(s.offsets) for s in schedules])
+    order = np.argsort(position, kind="stable")
+    offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(counts[order], out=offsets[1:])
+    rows = np.repeat(starts[order] - offsets[:-1], counts[order]) + np.arange(
+        offsets[-1]
+    )
+    return PortfolioSchedule(
+        **{
+            name: np.concatenate([getattr(s, name) for s in schedules])[rows]
+            for name in ("loan_id", "date", *AMOUNT_COLUMNS)
+        },
+        offsets=offsets,
+    )
+
+
+def apply_portfolio_base_fees(schedule: PortfolioSchedule, amount) -> PortfolioSchedule:
+    """Transform repayment schedules from a interests to base_fees vision.
+
+    Columnar ``apply_base_fees`` over all loans at once: the total interests of
+    each loan are allocated to its first repayments, each one capped by its
+    amount. The input schedule is left untouched.
+
+    Parameters
+    ----------
+    schedule : PortfolioSchedule
+        Repayment schedules as interests.
+    amount : int or array-like
+        Principal amount of each loan in cents.
+
+    Returns
+    -------
+    PortfolioSchedule
+        Repayment schedules as base fees.
+    """
+    counts = np.diff(schedule.offsets)
+    amount = np.broadcast_to(np.asarray(amount, dtype=np.int64), counts.shape)
+    repayment = schedule.amount_repayment
+    total_interests = segment_sum(schedule.amount_interests, schedule.offsets)
+
+    # fees already allocated before a repayment are capped by what was repaid
+    repaid_before = segment_cumsum(repayment, schedule.offsets) - repayment
+    base_fees = np.clip(
+        np.repeat(total_interests, counts) - repaid_before, 0, repayment
+    )
+    principal = repayment - base_fees
+    remaining = np.repeat(amount, counts) - segment_cumsum(principal, schedule.offsets)
+
+    return replace(
+        schedule,
+        amount_principal=principal,
+        amount_interests=np.zeros_like(schedule.amount_interests),
+        amount_base_fees=base_fees,
+        amount_remaining_principal=remaining,
+    )
+
+
+def segment_cumsum(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Cumulative sum of values, restarting at each offset."""
+    cumsum = np.cumsum(values)
+    before = np.concatenate([[0], cumsum])[offsets[:-1]]
+    return cumsum - np.repeat(before, np.diff(offsets))
+
+
+def segment_sum(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Sum of values between consecutive offsets."""
+    cumsum = np.concatenate([[0], np.cumsum(values)])
+    return cumsum[offsets[1:]] - cumsum[offsets[:-1]]
+
+
+def validate_portfolio_inputs(
+    amount: np.ndarray,
+    taeg: np.ndarray,
+    number_repayments: np.ndarray,
+    start_date: np.ndarray,
+    days_first_repayment: np.ndarray,
+    raise_errors: bool = True,
+) -> np.ndarray:
+    """Validate loan parameters, see ``validate_inputs``.
+
+    Returns the mask of valid loans, or raises on the first invalid check if
+    ``raise_errors`` is True.
+    """
+    checks = [
+        (
+            amount >= 100,
+            "The principal amount of the loan must be greater than 1 euro.",
+        ),
+        (
+            (taeg >= 0) & (taeg <= 1),
+            "The annual percentage rate of charge must be between 0 and 1.",
+        ),
+        (number_repayments > 0, "The number of repayments must be greater than 0."),
+        (
+            number_repayments <= MAX_NUMBER_REPAYMENTS,
+            f"The number of repayments must be at most {MAX_NUMBER_REPAYMENTS}.",
+        ),
+        (~np.isnat(start_date), "The start date must be a date."),
+        (
+            days_first_repayment > 0,
+            "The number of days before the first repayment must be greater than 0.",
+        ),
+    ]
+    valid = np.ones(amount.shape, dtype=bool)
+    for check, message in checks:
+        if raise_errors and not check.all():
+            raise ValueError(message)
+        valid &= check
+    return valid
+
+
+def add_months(date_input: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """Vectorized ``loan_calculator.add_months``, broadcasting dates against months.
+
+    Returns an array of shape ``date_input.shape + months.shape``.
+    """
+    date_input = np.asarray(date_input, dtype="datetime64[D]")[..., None]
+    month_start = date_input.astype("datetime64[M]")
+    day = (date_input - month_start.astype("datetime64[D]")).astype(np.int64)
+    target = month_start + np.asarray(months)
+    month_length = ((target + 1).astype("datetime64[D]") - target).astype(np.int64)
+    return target.astype("datetime64[D]") + np.minimum(day, month_length - 1)
+
+
+def python_pow(base, days, per: int = 1) -> np.ndarray:
+    """Elementwise ``base ** (days / per)`` for integer day counts, rounded
+    exactly like python floats.
+
+    numpy may dispatch ``power`` to SIMD kernels which differ from the libm by
+    one ulp, enough to move a floored amount by one cent. Distinct pairs are
+    few (a handful of rates times a few hundred day counts), so they are
+    computed in python and broadcast back.
+    """
+    base = np.asarray(base, dtype=np.float64)
+    days = np.asarray(days, dtype=np.int64)
+    bases, base_codes = np.unique(base, return_inverse=True)
+    n_days = int(days.max(initial=0)) + 1
+    codes = base_codes.reshape(base.shape) * n_days + days
+    if len(bases) * n_days <= 1 << 22:
+        # dense lookup table, avoids sorting one code per schedule row
+        needed = np.zeros(len(bases) * n_days, dtype=bool)
+        needed[codes] = True
+        unique_codes = np.flatnonzero(needed)
+        inverse = codes
+    else:
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        inverse = inverse.reshape(codes.shape)
+    values = np.array(
+        [
+            b ** (d / per)
+            for b, d in zip(
+                bases[unique_codes // n_days].tolist(),
+                (unique_codes % n_days).tolist(),
+            )
+        ],
+        dtype=np.float64,
+    )
+    if inverse is codes:
+        table = np.empty(len(bases) * n_days)
+        table[unique_codes] = values
+        return table[codes]
+    return values[inverse]
+
+
+def python_sum(values: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Row-wise builtin ``sum`` of floats, with the same accumulation order.
+
+    Since python 3.12, ``sum`` uses Neumaier compensated summation.
+    """
+    if mask is None:
+        mask = np.ones(values.shape, dtype=bool)
+    total = np.zeros(values.shape[0])
+    compensation = np.zeros(values.shape[0])
+    for k in range(values.shape[1]):
+        x = np.where(mask[:, k], values[:, k], 0.0)
+        t = total + x
+        if sys.version_info >= (3, 12):
+            compensation += np.where(
+                np.abs(total) >= np.abs(x), (total - t) + x, (x - t) + total
+            )
+        total = t
+    return total + compensation
@@ -0,0 +1,252 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from loan_portfolio import PortfolioSchedule
+
+MAX_CHUNK_CELLS = 4_000_000
+
+
+@dataclass
+class SimulationResult:
+    """Aggregated outcome of a Monte Carlo simulation over a portfolio.
+
+    ``loans`` has one row per loan with the default and prepayment
+    probabilities, the expected total cashflow in cents and percentiles of the
+    XIRR distribution. ``expected_cashflows`` is aligned with the rows of the
+    simulated schedule.
+    """
+
+    loans: pd.DataFrame
+    expected_cashflows: np.ndarray
+
+
+def simulate_portfolio(
+    schedule: PortfolioSchedule,
+    start_date,
+    n_scenarios: int,
+    prepayment_rate=0.0,
+    default_rate=0.0,
+    recovery_rate=0.0,
+    percentiles: Sequence[float] = (5, 50, 95),
+    seed: int = 0,
+    workers: Optional[int] = 1,
+    chunk_size: Optional[int] = None,
+) -> SimulationResult:
+    """Simulate random prepayments and defaults on repayment schedules.
+
+    In each scenario, each loan is prepaid at an installment with probability
+    ``prepayment_rate``: the installment is paid along with the remaining
+    principal, and nothing afterwards. It defaults at an installment with
+    probability ``default_rate``: nothing is paid from this installment on,
+    except ``recovery_rate`` of the remaining principal, recovered at its date.
+    A default takes precedence over a prepayment at the same installment.
+
+    Loans are split in chunks, each simulated with its own child seed of
+    ``seed``: results only depend on the inputs and on ``chunk_size``, not on
+    the number of workers.
+
+    Parameters
+    ----------
+    schedule : PortfolioSchedule
+        Repayment schedules of the loans, as interests or base fees.
+    start_date : date or array-like
+        Start date of each loan.
+    n_scenarios : int
+        Number of scenarios.
+    prepayment_rate : float or array-like, optional
+        Probability of prepayment at each installment, per loan, by default 0
+    default_rate : float or array-like, optional
+        Probability of default at each installment, per loan, by default 0
+    recovery_rate : float or array-like, optional
+        Share of the remaining principal recovered on default, per loan, by default 0
+    percentiles : Sequence[float], optional
+        Percentiles of the XIRR distributions, by default (5, 50, 95)
+    seed : int, optional
+        Seed of the random generators, by default 0
+    workers : int, optional
+        Number of worker processes, None for the number of CPUs, by default 1
+    chunk_size : int, optional
+        Number of loans simulated at once, by default bounded so that a chunk
+        holds a few million cashflows.
+
+    Returns
+    -------
+    SimulationResult
+        Aggregated outcome of the simulation.
+    """
+    counts = np.diff(schedule.offsets)
+    n_loans, n_max = len(counts), int(counts.max(initial=0))
+    if chunk_size is None:
+        chunk_size = max(1, MAX_CHUNK_CELLS // max(n_scenarios * n_max, 1))
+
+    # padded (loan, installment) views of the schedules
+    mask = np.arange(n_max) < counts[:, None]
+    start_date = np.broadcast_to(
+        np.asarray(start_date, dtype="datetime64[D]"), counts.shape
+    )
+    repayment = schedule.padded(schedule.amount_repayment)
+    remaining = schedule.padded(schedule.amount_remaining_principal)
+    days = schedule.padded(
+        (schedule.date - np.repeat(start_date, counts)).astype(np.int64)
+    )
+    first = schedule.offsets[:-1]
+    amount = (
+        schedule.amount_principal[first] + schedule.amount_remaining_principal[first]
+    )
+    rates = np.broadcast_arrays(
+        np.asarray(prepayment_rate, dtype=np.float64),
+        np.asarray(default_rate, dtype=np.float64),
+        np.asarray(recovery_rate, dtype=np.float64),
+        counts,
+    )[:3]
+
+    chunks = range(0, n_loans, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [
+        (
+            mask[i : i + chunk_size],
+            repayment[i : i + chunk_size],
+            remaining[i : i + chunk_size],
+            days[i : i + chunk_size],
+            amount[i : i + chunk_size],
+            *(r[i : i + chunk_size] for r in rates),
+            n_scenarios,
+            tuple(percentiles),
+            chunk_seed,
+        )
+        for i, chunk_seed in zip(chunks, seeds)
+    ]
+    if workers == 1 or len(tasks) <= 1:
+        results = [simulate_chunk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(simulate_chunk, *zip(*tasks)))
+
+    loans = pd.DataFrame(
+        {
+            "loan_id": schedule.loan_id[schedule.offsets[:-1]],
+            "default_probability": np.concatenate(
+                [r[0] for r in results] or [np.zeros(0)]
+            ),
+            "prepayment_probability": np.concatenate(
+                [r[1] for r in results] or [np.zeros(0)]
+            ),
+        }
+    )
+    expected_cashflows = np.zeros(mask.shape)
+    if results:
+        expected_cashflows = np.concatenate([r[2] for r in results])
+    loans["expected_cashflows"] = expected_cashflows.sum(axis=1)
+    xirr_percentiles = np.concatenate(
+        [r[3] for r in results] or [np.zeros((0, len(percentiles)))]
+    )
+    for j, q in enumerate(percentiles):
+        loans[f"xirr_p{q:g}"] = xirr_percentiles[:, j]
+    return SimulationResult(loans=loans, expected_cashflows=expected_cashflows[mask])
+
+
+def simulate_chunk(
+    mask: np.ndarray,
+    repayment: np.ndarray,
+    remaining: np.ndarray,
+    days: np.ndarray,
+    amount: np.ndarray,
+    prepayment_rate: np.ndarray,
+    default_rate: np.ndarray,
+    recovery_rate: np.ndarray,
+    n_scenarios: int,
+    percentiles: Sequence[float],
+    seed: np.random.SeedSequence,
+):
+    """Simulate all scenarios for a chunk of loans, see ``simulate_portfolio``.
+
+    Returns the default and prepayment probabilities, the expected cashflows
+    and the XIRR percentiles of each loan.
+    """
+    rng = np.random.default_rng(seed)
+    n_loans, n_max = mask.shape
+    shape = (n_scenarios, n_loans)
+    default_at = event_index(rng, default_rate, shape, n_max)
+    prepay_at = event_index(rng, prepayment_rate, shape, n_max)
+    defaulted = default_at <= prepay_at
+    default_at = np.where(defaulted, default_at, n_max)
+    prepay_at = np.where(defaulted, n_max, prepay_at)
+
+    k = np.arange(n_max)
+    remaining_before = np.concatenate([amount[:, None], remaining[:, :-1]], axis=1)
+    recovery = np.floor(recovery_rate[:, None] * remaining_before).astype(np.int64)
+    cashflows = np.where(k < np.minimum(default_at, prepay_at)[..., None], repayment, 0)
+    cashflows += np.where(
+        k == prepay_at[..., None], repayment + remaining, 0
+    ) + np.where(k == default_at[..., None], recovery, 0)
+    cashflows *= mask
+
+    n_installments = mask.sum(axis=1)
+    # most scenarios follow the schedule, whose rate is a close starting point
+    guess = xirr(amount, repayment * mask, days)
+    rates = xirr(amount, cashflows, days, guess)
+    return (
+        (default_at < n_installments).mean(axis=0),
+        (prepay_at < n_installments).mean(axis=0),
+        cashflows.mean(axis=0),
+        np.percentile(rates, percentiles, axis=0).T,
+    )
+
+
+def event_index(
+    rng: np.random.Generator, probability: np.ndarray, shape: tuple, n_max: int
+) -> np.ndarray:
+    """Draw the installment of a first event with a constant probability per
+    installment (geometric distribution), n_max if it never happens."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        index = np.floor(np.log(rng.random(shape)) / np.log1p(-probability))
+    return np.where(np.isfinite(index), np.minimum(index, n_max), n_max).astype(
+        np.int64
+    )
+
+
+def xirr(
+    amount: np.ndarray,
+    cashflows: np.ndarray,
+    days: np.ndarray,
+    guess=0.0,
+    tol: float = 1e-10,
+    max_iter: int = 200,
+) -> np.ndarray:
+    """Vectorized XIRR of loans: ``amount`` lent at day 0, ``cashflows`` received
+    at ``days``, with the 365 days convention of ``pyxirr.xirr``.
+
+    The net present value is convex and decreasing in ``log(1 + rate)``, so
+    Newton's method converges from any starting point; only the rates which
+    have not converged yet are iterated on. Loans which get nothing back have a
+    rate of -1.
+    """
+    shape = np.broadcast_shapes(amount.shape, cashflows.shape[:-1])
+    n_max = cashflows.shape[-1]
+    cashflows = np.broadcast_to(cashflows, (*shape, n_max)).reshape(
+        math.prod(shape), n_max
+    )
+    t = np.broadcast_to(days / 365, (*shape, n_max)).reshape(math.prod(shape), n_max)
+    amount = np.broadcast_to(amount, shape).ravel()
+    x = np.log1p(np.broadcast_to(np.asarray(guess, dtype=np.float64), shape)).ravel()
+    # keep discount factors finite for long schedules
+    x_min = -min(50.0, 700 / max(t.max(initial=0), 1e-9))
+
+    active = np.flatnonzero(cashflows.sum(axis=1) > 0)
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        discounted = cashflows[active] * np.exp(-x[active, None] * t[active])
+        npv = discounted.sum(axis=1) - amount[active]
+        derivative = -(discounted * t[active]).sum(axis=1)
+        step = npv / derivative
+        x[active] = np.clip(x[active] - step, x_min, 50)
+        active = active[np.abs(step) >= tol]
+
+    rates = np.where(cashflows.sum(axis=1) > 0, np.expm1(x), -1.0)
+    return rates.reshape(shape)
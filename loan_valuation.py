@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+from loan_portfolio import PortfolioSchedule, python_pow, segment_sum
+
+
+class ValuationIndex:
+    """Date index over portfolio schedules, to value loans as of any date.
+
+    As of a date, repayments due on or before that date are considered paid.
+    The outstanding principal is the remaining principal after the last paid
+    repayment, and accrued interests are computed on it since that repayment
+    (or since the start date) with the convention of ``compute_interval_rate``,
+    floored to the cent like the interests of the schedule. Loans whose schedule
+    carries no interests (e.g. as base fees) accrue no interests.
+
+    Parameters
+    ----------
+    schedule : PortfolioSchedule
+        Repayment schedules of the loans.
+    taeg : float or array-like
+        Annual percentage rate of charge of each loan, between 0 and 1.
+    start_date : date or array-like
+        Start date of each loan.
+    """
+
+    def __init__(self, schedule: PortfolioSchedule, taeg, start_date):
+        counts = np.diff(schedule.offsets)
+        first = schedule.offsets[:-1]
+        self.offsets = schedule.offsets
+        self.loan_id = schedule.loan_id[first]
+        self.taeg = np.broadcast_to(np.asarray(taeg, dtype=np.float64), counts.shape)
+        self.start_date = np.broadcast_to(
+            np.asarray(start_date, dtype="datetime64[D]"), counts.shape
+        )
+        self.amount = (
+            schedule.amount_principal[first]
+            + schedule.amount_remaining_principal[first]
+        )
+        self.has_interests = segment_sum(schedule.amount_interests, self.offsets) > 0
+        self.date = schedule.date
+        self.amount_remaining_principal = schedule.amount_remaining_principal
+
+        # rows are sorted by loan then date, so (loan, date) keys are sorted
+        all_dates = np.concatenate([self.date, self.start_date])
+        self.origin = all_dates.min() if len(all_dates) else np.datetime64(0, "D")
+        self.span = (all_dates.max(initial=self.origin) - self.origin).astype(int) + 2
+        loan_index = np.repeat(np.arange(len(counts)), counts)
+        self.keys = loan_index * self.span + (self.date - self.origin).astype(np.int64)
+
+    def value(self, as_of_date) -> pd.DataFrame:
+        """Value every loan as of one or several dates.
+
+        Parameters
+        ----------
+        as_of_date : date or array-like
+            Valuation dates.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per valuation date and loan, with the outstanding principal
+            and the accrued interests in cents.
+        """
+        as_of_date = np.atleast_1d(np.asarray(as_of_date, dtype="datetime64[D]"))
+        n_loans = len(self.amount)
+        loan_index = np.arange(n_loans)
+        # dates outside of the index are clipped, as nothing happens there
+        days = (as_of_date - self.origin).astype(np.int64)
+        days = np.clip(days, -1, self.span - 1)[:, None]
+
+        paid = (
+            np.searchsorted(self.keys, loan_index * self.span + days, side="right")
+            - self.offsets[:-1]
+        )
+        counts = np.diff(self.offsets)
+        started = as_of_date[:, None] >= self.start_date
+        active = started & (paid < counts)
+
+        last_paid = np.maximum(self.offsets[:-1] + paid - 1, 0)
+        outstanding = np.where(
+            paid > 0, self.amount_remaining_principal[last_paid], self.amount
+        )
+        outstanding = np.where(active, outstanding, 0)
+        last_date = np.where(paid > 0, self.date[last_paid], self.start_date)
+        elapsed = np.where(
+            active, (as_of_date[:, None] - last_date).astype(np.int64), 0
+        )
+        accrued = np.floor(
+            outstanding * (python_pow(1 + self.taeg, elapsed, per=365) - 1)
+        ).astype(np.int64)
+        accrued = np.where(self.has_interests, accrued, 0)
+
+        return pd.DataFrame(
+            {
+                "as_of_date": np.repeat(as_of_date, n_loans),
+                "loan_id": np.tile(self.loan_id, len(as_of_date)),
+                "amount_remaining_principal": outstanding.ravel(),
+                "amount_accrued_interests": accrued.ravel(),
+            }
+        )
@@ -0,0 +1,200 @@
+from datetime import date
+from pathlib import Path
+from typing import List, Literal, Optional, Sequence
+
+import numpy as np
+
+from loan_calculator import Repayment, run_loan_calculator
+from loan_portfolio import AMOUNT_COLUMNS, add_months, run_portfolio_calculator
+
+# ranges of the streamlit app sliders
+AMOUNTS = range(10000, 300001, 10000)
+NUMBERS_REPAYMENTS = range(1, 25)
+DAYS_FIRST_REPAYMENTS = range(30, 61)
+
+
+class OfferCatalog:
+    """Precomputed repayment schedules of every standard offer of a start date.
+
+    A schedule only depends on its amount, TAEG, number of repayments and on
+    the numbers of days between the start date and each repayment date. For a
+    TAEG and a number of days before the first repayment, the schedules of all
+    amounts and numbers of repayments form a block, keyed by these numbers of
+    days. When the start date changes, blocks with the same key are reused and
+    only the others are computed: most of them are, as long as repayment days
+    do not cross a month end.
+
+    Schedules are stored in one int32 array, indexed by block, number of
+    repayments, amount and repayment, so that a quote is a direct lookup.
+
+    Parameters
+    ----------
+    taegs : Sequence[float]
+        Annual percentage rates of charge of the offers.
+    as_interests_or_base_fees : Literal['interests', 'base_fees'], optional
+        Schedules as interests or base fees, by default 'interests'
+    snapshot_path : Path, optional
+        File in which the catalog is saved after each build and loaded from at
+        creation, by default no snapshot.
+    start_date : date, optional
+        Start date of the offers, by default today.
+    """
+
+    def __init__(
+        self,
+        taegs: Sequence[float],
+        as_interests_or_base_fees: Literal["interests", "base_fees"] = "interests",
+        snapshot_path: Optional[Path] = None,
+        start_date: Optional[date] = None,
+    ):
+        self.taegs = list(taegs)
+        self.as_interests_or_base_fees = as_interests_or_base_fees
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.start_date = None
+        self.block_keys = np.zeros((0, len(NUMBERS_REPAYMENTS) + 1), dtype=np.int64)
+        self.blocks = np.zeros(
+            (0, len(NUMBERS_REPAYMENTS), len(AMOUNTS), NUMBERS_REPAYMENTS[-1], 5),
+            dtype=np.int32,
+        )
+        self.n_computed_blocks = 0
+        if self.snapshot_path is not None and self.snapshot_path.exists():
+            self.load(self.snapshot_path)
+        self.build(start_date or date.today())
+
+    def build(self, start_date: date):
+        """Build the catalog of a start date, reusing the blocks already computed."""
+        if start_date == self.start_date:
+            return
+        start = np.datetime64(start_date, "D")
+        days_first_repayment = np.array(DAYS_FIRST_REPAYMENTS)
+        dates = add_months(
+            start + days_first_repayment, np.arange(NUMBERS_REPAYMENTS[-1])
+        )
+        days = (dates - start).astype(np.int64)
+
+        # block keys: taeg index and numbers of days of each repayment
+        keys = np.concatenate(
+            [
+                np.repeat(np.arange(len(self.taegs)), len(days))[:, None],
+                np.tile(days, (len(self.taegs), 1)),
+            ],
+            axis=1,
+        )
+        known = {tuple(k): i for i, k in enumerate(self.block_keys.tolist())}
+        block_index = np.array([known.get(tuple(k), -1) for k in keys.tolist()])
+        missing = np.flatnonzero(block_index < 0)
+        new_blocks = self.compute_blocks(start, keys[missing])
+        self.n_computed_blocks = len(missing)
+
+        blocks = np.concatenate([self.blocks, new_blocks])
+        block_index[missing] = len(self.blocks) + np.arange(len(missing))
+        # only keep the blocks of this start date
+        self.blocks = blocks[block_index]
+        self.block_keys = keys
+        self.dates = dates
+        self.start_date = start_date
+        if self.snapshot_path is not None:
+            self.save(self.snapshot_path)
+
+    def compute_blocks(self, start: np.datetime64, keys: np.ndarray) -> np.ndarray:
+        """Compute the schedules of blocks of offers with the portfolio calculator."""
+        n_amounts, n_max = len(AMOUNTS), NUMBERS_REPAYMENTS[-1]
+        shape = (len(keys), len(NUMBERS_REPAYMENTS), n_amounts)
+        taeg = np.array(self.taegs)[keys[:, 0]]
+        days_first_repayment = keys[:, 1]
+        block, number_repayments, amount = np.meshgrid(
+            np.arange(len(keys)),
+            np.array(NUMBERS_REPAYMENTS),
+            np.array(AMOUNTS),
+            indexing="ij",
+        )
+        schedule = run_portfolio_calculator(
+            amount.ravel(),
+            taeg[block.ravel()],
+            number_repayments.ravel(),
+            start,
+            days_first_repayment[block.ravel()],
+            self.as_interests_or_base_fees,
+            loan_id=np.arange(block.size),
+            errors="drop",
+        )
+        # offers with too high interests are left with zero repayments
+        blocks = np.zeros((block.size, n_max, 5), dtype=np.int32)
+        offer = schedule.loan_id[schedule.offsets[:-1]]
+        for j, name in enumerate(AMOUNT_COLUMNS):
+            values = schedule.padded(getattr(schedule, name))
+            blocks[offer, : values.shape[1], j] = values
+        return blocks.reshape(*shape, n_max, 5)
+
+    def quote(
+        self,
+        amount: int,
+        taeg: float,
+        number_repayments: int,
+        start_date: Optional[date] = None,
+        days_first_repayment: int = 45,
+    ) -> List[Repayment]:
+        """Return the repayment schedule of an offer, see ``run_loan_calculator``.
+
+        Offers of the catalog are looked up, the others are computed. The catalog
+        is rebuilt when the start date is a new today.
+        """
+        if start_date is None:
+            start_date = date.today()
+        if start_date != self.start_date and start_date == date.today():
+            self.build(start_date)
+        if (
+            start_date == self.start_date
+            and amount in AMOUNTS
+            and taeg in self.taegs
+            and number_repayments in NUMBERS_REPAYMENTS
+            and days_first_repayment in DAYS_FIRST_REPAYMENTS
+        ):
+            d = DAYS_FIRST_REPAYMENTS.index(days_first_repayment)
+            block = self.taegs.index(taeg) * len(DAYS_FIRST_REPAYMENTS) + d
+            rows = self.blocks[
+                block,
+                NUMBERS_REPAYMENTS.index(number_repayments),
+                AMOUNTS.index(amount),
+                :number_repayments,
+            ]
+            if rows[0, 0]:
+                dates = self.dates[d]
+                return [
+                    Repayment(d, *r)
+                    for d, r in zip(dates.astype(object).tolist(), rows.tolist())
+                ]
+        return run_loan_calculator(
+            amount,
+            taeg,
+            number_repayments,
+            start_date,
+            days_first_repayment,
+            self.as_interests_or_base_fees,
+        )
+
+    def save(self, path: Path):
+        """Save the catalog to a npz file."""
+        tmp_path = path.with_name(f".{path.name}.tmp.npz")
+        np.savez(
+            tmp_path,
+            start_date=np.datetime64(self.start_date, "D"),
+            taegs=np.array(self.taegs),
+            as_interests_or_base_fees=self.as_interests_or_base_fees,
+            block_keys=self.block_keys,
+            blocks=self.blocks,
+        )
+        tmp_path.replace(path)
+
+    def load(self, path: Path):
+        """Load the blocks of a catalog saved with the same offers."""
+        with np.load(path) as snapshot:
+            if (
+                snapshot["taegs"].tolist() != self.taegs
+                or str(snapshot["as_interests_or_base_fees"])
+                != self.as_interests_or_base_fees
+                or snapshot["blocks"].shape[1:] != self.blocks.shape[1:]
+            ):
+                return
+            self.block_keys = snapshot["block_keys"]
+            self.blocks = snapshot["blocks"]
@@ -0,0 +1,87 @@
+# Streamlit portfolio page
+import hashlib
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from batch_job import LOAN_COLUMNS
+from portfolio_job import PortfolioJob
+from portfolio_results import show_results
+
+MAX_JOBS = 8
+
+st.set_page_config(page_title="Portfolio")
+st.title("Portfolio")
+st.write(
+    "Upload a CSV file of loans to compute their repayment schedules, "
+    "with the columns: "
+    + ", ".join(f"`{c}`" for c in LOAN_COLUMNS)
+    + ". Amounts are in cents and TAEGs between 0 and 1."
+)
+
+
+@st.cache_resource
+def get_jobs() -> dict:
+    """Jobs shared by all sessions, by file hash and schedule type."""
+    return {"lock": threading.Lock(), "jobs": {}}
+
+
+uploaded_file = st.file_uploader("Loans", type="csv")
+as_interests_or_base_fees = st.radio(
+    "Repayment schedule as interests or base fees", ("Interests", "Base fees")
+)
+as_interests_or_base_fees = (
+    "interests" if as_interests_or_base_fees == "Interests" else "base_fees"
+)
+if uploaded_file is None:
+    st.stop()
+
+# hash the upload once per file, by blocks
+if st.session_state.get("file_id") != uploaded_file.file_id:
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    while block := uploaded_file.read(1 << 20):
+        digest.update(block)
+    st.session_state["file_id"] = uploaded_file.file_id
+    st.session_state["file_hash"] = digest.hexdigest()
+key = (st.session_state["file_hash"], as_interests_or_base_fees)
+
+cache = get_jobs()
+with cache["lock"]:
+    jobs = cache["jobs"]
+    job = jobs.get(key)
+    if job is None or job.error is not None:
+        workdir = Path(tempfile.mkdtemp(prefix="portfolio-"))
+        uploaded_file.seek(0)
+        with open(workdir / "loans.csv", "wb") as f:
+            shutil.copyfileobj(uploaded_file, f)
+        header = pd.read_csv(workdir / "loans.csv", nrows=0).columns
+        missing = [c for c in LOAN_COLUMNS if c not in header]
+        if missing:
+            shutil.rmtree(workdir)
+            st.error(f"Missing columns: {', '.join(missing)}")
+            st.stop()
+        job = PortfolioJob(workdir / "loans.csv", workdir, as_interests_or_base_fees)
+        job.start()
+        jobs[key] = job
+        # forget the oldest finished jobs, and their files
+        for old_key in list(jobs)[:-MAX_JOBS]:
+            if not jobs[old_key].is_alive():
+                shutil.rmtree(jobs.pop(old_key).output_dir, ignore_errors=True)
+
+if job.is_alive():
+    st.progress(
+        job.progress, text=f"{job.loans_done} / {job.total_loans} loans computed"
+    )
+    time.sleep(1)
+    st.rerun()
+if job.error is not None:
+    st.error(f"The computation failed: {job.error}")
+    st.stop()
+
+show_results(job)
@@ -0,0 +1,161 @@
+import threading
+from dataclasses import replace
+from pathlib import Path
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet as pq
+
+from batch_job import count_loans, parse_loans, read_loans
+from loan_portfolio import run_portfolio_calculator, segment_sum
+from loan_simulation import xirr
+
+
+class PortfolioJob(threading.Thread):
+    """Background computation of the schedules of a csv file of loans.
+
+    The loans are read and computed by chunks, and results are written to
+    parquet files of the output directory as they come, so that memory only
+    depends on the chunk size. Progress is exposed through ``loans_done`` and
+    ``total_loans``.
+
+    Parameters
+    ----------
+    path : Path
+        Csv file of loans, with the columns of ``batch_job.LOAN_COLUMNS``.
+    output_dir : Path
+        Directory of the schedules and summary files.
+    as_interests_or_base_fees : Literal['interests', 'base_fees'], optional
+        Schedules as interests or base fees, by default 'interests'
+    chunk_size : int, optional
+        Number of loans computed at once, by default 20000
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        output_dir: Path,
+        as_interests_or_base_fees: Literal["interests", "base_fees"] = "interests",
+        chunk_size: int = 20_000,
+    ):
+        super().__init__(daemon=True)
+        self.path = Path(path)
+        self.output_dir = Path(output_dir)
+        self.as_interests_or_base_fees = as_interests_or_base_fees
+        self.chunk_size = chunk_size
+        self.schedules_path = self.output_dir / "schedules.parquet"
+        self.summary_path = self.output_dir / "summary.parquet"
+        self.total_loans = count_loans(self.path)
+        self.loans_done = 0
+        self.finished = False
+        self.error: Optional[Exception] = None
+
+    @property
+    def progress(self) -> float:
+        """Share of the loans computed, between 0 and 1."""
+        return min(self.loans_done / max(self.total_loans, 1), 1.0)
+
+    def run(self):
+        schedules_writer = summary_writer = None
+        try:
+            for loans in read_loans(self.path, self.chunk_size):
+                schedules, summary = self.compute_chunk(loans)
+                if schedules_writer is None:
+                    schedules_writer = pq.ParquetWriter(
+                        self.schedules_path, schedules.schema
+                    )
+                    summary_writer = pq.ParquetWriter(self.summary_path, summary.schema)
+                schedules_writer.write_table(schedules.cast(schedules_writer.schema))
+                summary_writer.write_table(summary.cast(summary_writer.schema))
+                self.loans_done += len(loans)
+            self.finished = True
+        except Exception as e:
+            self.error = e
+        finally:
+            for writer in (schedules_writer, summary_writer):
+                if writer is not None:
+                    writer.close()
+
+    def compute_chunk(self, loans: pd.DataFrame):
+        """Compute the schedules and the per-loan summary of a chunk of loans."""
+        loan_id = loans["loan_id"].to_numpy(dtype=str)
+        # malformed values are parsed as invalid, their loans are rejected
+        parameters = parse_loans(loans)
+        amount, taeg = parameters["amount"], parameters["taeg"]
+        start_date = parameters["start_date"]
+        # loans are identified by position, to report the ones left out
+        schedule = run_portfolio_calculator(
+            **parameters,
+            as_interests_or_base_fees=self.as_interests_or_base_fees,
+            errors="drop",
+        )
+        position = schedule.loan_id[schedule.offsets[:-1]]
+
+        counts = np.diff(schedule.offsets)
+        days = (schedule.date - np.repeat(start_date[position], counts)).astype(
+            np.int64
+        )
+        rates = xirr(
+            amount[position],
+            schedule.padded(schedule.amount_repayment),
+            schedule.padded(days),
+            guess=taeg[position],
+        )
+
+        summary = pd.DataFrame(
+            {
+                "loan_id": loan_id,
+                "status": np.where(
+                    np.isin(np.arange(len(loans)), position), "ok", "rejected"
+                ),
+                "amount": amount,
+                "taeg": taeg,
+                "number_repayments": parameters["number_repayments"],
+            }
+        )
+        ok = summary["status"] == "ok"
+        for name, values in [
+            (
+                "total_repayment",
+                segment_sum(schedule.amount_repayment, schedule.offsets),
+            ),
+            (
+                "total_fees",
+                segment_sum(
+                    schedule.amount_interests + schedule.amount_base_fees,
+                    schedule.offsets,
+                ),
+            ),
+        ]:
+            summary[name] = pd.Series(pd.NA, index=summary.index, dtype="Int64")
+            summary.loc[ok, name] = values
+        summary["xirr"] = np.nan
+        summary.loc[ok, "xirr"] = rates
+        summary["xirr_above_taeg"] = summary["xirr"] - summary["taeg"] > 1e-9
+
+        schedule = replace(schedule, loan_id=loan_id[schedule.loan_id])
+        return schedule.to_arrow(), pa.Table.from_pandas(summary, preserve_index=False)
+
+    @property
+    def n_parts(self) -> int:
+        """Number of parts of the schedules, one per chunk of loans."""
+        return pq.ParquetFile(self.schedules_path).num_row_groups
+
+    def schedules_part(
+        self, part: int, file_format: Literal["parquet", "csv"] = "parquet"
+    ) -> bytes:
+        """Return a part of the schedules as a parquet or csv file.
+
+        Schedules are downloaded by parts, so that memory only depends on the
+        chunk size.
+        """
+        table = pq.ParquetFile(self.schedules_path).read_row_group(part)
+        sink = pa.BufferOutputStream()
+        if file_format == "parquet":
+            pq.write_table(table, sink)
+        else:
+            pyarrow.csv.write_csv(table, sink)
+        return sink.getvalue().to_pybytes()
@@ -0,0 +1,54 @@
+import pandas as pd
+import streamlit as st
+
+from portfolio_job import PortfolioJob
+
+
+# as many summaries as jobs kept by the portfolio page
+@st.cache_resource(max_entries=8)
+def load_summary(path: str) -> pd.DataFrame:
+    """Summary of a finished job, read once and shared by the reruns."""
+    return pd.read_parquet(path)
+
+
+def show_results(job: PortfolioJob):
+    """Show the summary of a finished job, and the downloads of its results.
+
+    Files are only prepared on demand, and schedules are downloaded by parts of
+    one chunk of loans, so that memory only depends on the chunk size.
+    """
+    summary = load_summary(str(job.summary_path))
+    ok = summary["status"] == "ok"
+    st.write(f"Loans: {len(summary)}, rejected: {(~ok).sum()}")
+    st.write(f"Total repayments: {round(summary['total_repayment'].sum() / 100, 2)}")
+    st.write(f"Total fees: {round(summary['total_fees'].sum() / 100, 2)}")
+    n_above_taeg = summary["xirr_above_taeg"].sum()
+    if n_above_taeg:
+        st.warning(
+            f"Warning! XIRR > TAEG for {n_above_taeg} loans, this should not happen!"
+        )
+    st.dataframe(summary.head(1000), use_container_width=True)
+
+    n_parts = job.n_parts
+    if n_parts:
+        st.write(
+            f"Schedules are downloaded in {n_parts} parts "
+            f"of up to {job.chunk_size} loans."
+        )
+        part = st.selectbox("Part", range(1, n_parts + 1))
+        file_format = st.radio("Format", ("Parquet", "CSV"), horizontal=True).lower()
+    if not st.checkbox("Prepare downloads"):
+        return
+    if n_parts:
+        st.download_button(
+            f"Download schedules, part {part} ({file_format})",
+            data=job.schedules_part(part - 1, file_format),
+            file_name=f"schedules-{part}.{file_format}",
+            mime="text/csv" if file_format == "csv" else "application/octet-stream",
+        )
+    st.download_button(
+        "Download summary (CSV)",
+        data=summary.to_csv(index=False),
+        file_name="summary.csv",
+        mime="text/csv",
+    )
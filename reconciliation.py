@@ -0,0 +1,205 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from itertools import chain
+from typing import Iterable, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from loan_portfolio import PortfolioSchedule
+
+Payment = Tuple[object, Union[date, str, np.datetime64], int]
+
+
+class ReconciliationEngine:
+    """Match a stream of payments against expected repayment schedules.
+
+    Expected installments are kept in compact arrays, sorted by loan then due
+    date, with a hash index from loan id to its installments, in which due
+    dates are bisected. Payments are allocated as they come and not kept, so
+    memory only depends on the number of loans.
+
+    A payment goes to the open installment of its loan with the nearest due
+    date within ``tolerance_days`` of the payment date, or else to the oldest
+    open installment. What exceeds the installment goes to the next open ones,
+    then is kept as overpaid.
+
+    Parameters
+    ----------
+    schedule : PortfolioSchedule
+        Expected repayment schedules of the active loans.
+    tolerance_days : int, optional
+        Number of days a payment can be early or late and still match an
+        installment, and grace period before an installment is in arrears, by default 3
+    """
+
+    def __init__(self, schedule: PortfolioSchedule, tolerance_days: int = 3):
+        self.tolerance_days = tolerance_days
+        self.loan_ids = schedule.loan_id[schedule.offsets[:-1]]
+        self.rows = {
+            loan_id: (int(start), int(end))
+            for loan_id, start, end in zip(
+                self.loan_ids.tolist(),
+                schedule.offsets[:-1].tolist(),
+                schedule.offsets[1:].tolist(),
+            )
+        }
+        if len(self.rows) != len(self.loan_ids):
+            raise ValueError("The loan ids of the schedule must be unique.")
+        self.offsets = schedule.offsets
+        ordinals = (schedule.date - np.datetime64("0001-01-01")).astype(np.int64) + 1
+        self.due_date = array("l", ordinals.tolist())
+        self.amount_due = array("q", schedule.amount_repayment.tolist())
+        self.amount_paid = array("q", bytes(8 * len(schedule)))
+        self.last_payment_date = array(
+            "l", bytes(self.due_date.itemsize * len(schedule))
+        )
+        self.amount_overpaid = {}
+        self.unmatched_payments = 0
+        self.unmatched_amount = 0
+        self.rejected_payments = 0
+
+    def apply_payments(self, payments: Iterable[Payment]) -> int:
+        """Allocate payments, given as (loan id, payment date, amount in cents).
+
+        Payments of missing or malformed dates or amounts, or of amounts which
+        are not whole numbers of cents, are counted as rejected and skipped.
+
+        Returns
+        -------
+        int
+            Number of payments read.
+        """
+        n_payments = 0
+        for loan_id, payment_date, amount in payments:
+            n_payments += 1
+            try:
+                day, amount = parse_payment(payment_date, amount)
+            except (ValueError, TypeError):
+                self.rejected_payments += 1
+                continue
+            rows = self.rows.get(loan_id)
+            if rows is None:
+                self.unmatched_payments += 1
+                self.unmatched_amount += amount
+                continue
+            self.allocate(*rows, day, amount, loan_id)
+        return n_payments
+
+    def allocate(self, start: int, end: int, day: int, amount: int, loan_id):
+        """Allocate a payment to the installments of rows start to end."""
+        due_date, amount_due, amount_paid = (
+            self.due_date,
+            self.amount_due,
+            self.amount_paid,
+        )
+        lo = bisect_left(due_date, day - self.tolerance_days, start, end)
+        hi = bisect_right(due_date, day + self.tolerance_days, lo, end)
+        # nearest open installment within the tolerance, else the oldest one
+        first, distance = start, None
+        for i in range(lo, hi):
+            if amount_paid[i] < amount_due[i] and (
+                distance is None or abs(due_date[i] - day) < distance
+            ):
+                first, distance = i, abs(due_date[i] - day)
+        for i in chain(range(first, end), range(start, first)):
+            paid = min(amount, amount_due[i] - amount_paid[i])
+            if paid > 0:
+                amount_paid[i] += paid
+                self.last_payment_date[i] = day
+                amount -= paid
+                if not amount:
+                    return
+        if amount:
+            self.amount_overpaid[loan_id] = (
+                self.amount_overpaid.get(loan_id, 0) + amount
+            )
+
+    def status(self, as_of_date: Union[date, str]) -> pd.DataFrame:
+        """Return the status of each loan as of a date.
+
+        Installments due before the date minus the tolerance are in arrears if
+        not fully paid: missed if nothing was paid, partial otherwise. Fully
+        paid installments are late if their last payment came after their due
+        date plus the tolerance. Amounts paid on installments due after the
+        date are early.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per loan with the due, paid, arrears, early and overpaid
+            amounts in cents, the number of missed, partial and late
+            installments, and a status among 'closed', 'missed', 'partial',
+            'early' and 'current'.
+        """
+        if isinstance(as_of_date, str):
+            as_of_date = date.fromisoformat(as_of_date)
+        day = as_of_date.toordinal()
+        due_date = np.frombuffer(self.due_date, dtype=self.due_date.typecode)
+        amount_due = np.frombuffer(self.amount_due, dtype=np.int64)
+        amount_paid = np.frombuffer(self.amount_paid, dtype=np.int64)
+        last_payment_date = np.frombuffer(
+            self.last_payment_date, dtype=self.last_payment_date.typecode
+        )
+        n_loans = len(self.loan_ids)
+        loan = np.repeat(np.arange(n_loans), np.diff(self.offsets))
+
+        def per_loan(values):
+            return np.bincount(loan, weights=values, minlength=n_loans).astype(np.int64)
+
+        is_due = due_date <= day
+        # arrears only after the grace period
+        is_overdue = due_date < day - self.tolerance_days
+        unpaid = amount_due - amount_paid
+        late = (unpaid == 0) & (last_payment_date > due_date + self.tolerance_days)
+        df = pd.DataFrame(
+            {
+                "loan_id": self.loan_ids,
+                "amount_due": per_loan(np.where(is_due, amount_due, 0)),
+                "amount_paid": per_loan(amount_paid),
+                "amount_arrears": per_loan(np.where(is_overdue, unpaid, 0)),
+                "amount_early": per_loan(np.where(is_due, 0, amount_paid)),
+                "amount_overpaid": [
+                    self.amount_overpaid.get(loan_id, 0)
+                    for loan_id in self.loan_ids.tolist()
+                ],
+                "missed_installments": per_loan(is_overdue & (amount_paid == 0)),
+                "partial_installments": per_loan(
+                    is_overdue & (amount_paid > 0) & (unpaid > 0)
+                ),
+                "late_installments": per_loan(late),
+            }
+        )
+        closed = per_loan(unpaid) == 0
+        df["status"] = np.select(
+            [
+                closed,
+                df["missed_installments"] > 0,
+                df["partial_installments"] > 0,
+                df["amount_early"] > 0,
+            ],
+            ["closed", "missed", "partial", "early"],
+            "current",
+        )
+        return df
+
+
+def parse_payment(payment_date, amount) -> Tuple[int, int]:
+    """Return the ordinal day and the amount in cents of a payment.
+
+    Dates are dates, ISO strings or datetime64, and amounts whole numbers of
+    cents, possibly as floats. Raises a ValueError or TypeError otherwise.
+    """
+    if isinstance(payment_date, str):
+        payment_date = date.fromisoformat(payment_date)
+    elif isinstance(payment_date, np.datetime64):
+        # NaT becomes None
+        payment_date = payment_date.astype("datetime64[D]").item()
+    if not isinstance(payment_date, date):
+        raise TypeError("The payment date must be a date.")
+    # also raises on pandas NaT
+    day = payment_date.toordinal()
+    if amount != int(amount):
+        raise ValueError("The payment amount must be a whole number of cents.")
+    return day, int(amount)
@@ -0,0 +1,47 @@
+# usage:
+# uv run python scripts/benchmark_loan_calculator_batch.py [<number_loans> [<workers>]]
+import os
+import random
+import sys
+import sysconfig
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from loan_calculator_batch import gil_enabled, run_loan_calculator_batch  # noqa: E402
+
+if __name__ == "__main__":
+    number_loans = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+
+    # synthetic loans, with the ranges of the streamlit app
+    rng = random.Random(0)
+    loans = [
+        (
+            rng.randrange(1, 31) * 10000,
+            rng.choice([0.0, 0.05, 0.1, 0.2, 0.224]),
+            rng.randrange(1, 25),
+            date(2024, 1, 1) + timedelta(days=rng.randrange(366)),
+            rng.randrange(30, 61),
+            rng.choice(["interests", "base_fees"]),
+        )
+        for _ in range(number_loans)
+    ]
+    print(
+        f"Python {sys.version.split()[0]}, "
+        f"free-threaded build: {bool(sysconfig.get_config_var('Py_GIL_DISABLED'))}, "
+        f"GIL enabled: {gil_enabled()}"
+    )
+    print(f"{number_loans} loans, {workers} workers")
+
+    for name, options in [
+        ("single-threaded", {"workers": 1}),
+        ("threads", {"workers": workers, "executor": "threads"}),
+        ("processes", {"workers": workers, "executor": "processes"}),
+    ]:
+        start = time.perf_counter()
+        run_loan_calculator_batch(loans, errors="drop", **options)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {elapsed:.1f}s ({number_loans / elapsed:.0f} loans/s)")
@@ -0,0 +1,54 @@
+# usage:
+# uv run python scripts/benchmark_loan_calculator_sqlite.py [<number_loans> [<batch_size>]]
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from loan_calculator_sqlite import create_loan_calculator_table  # noqa: E402
+
+number_loans = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+
+# synthetic loans table, with the ranges of the streamlit app
+rng = np.random.default_rng(0)
+conn = sqlite3.connect(":memory:")
+conn.execute(
+    "create table loans (id integer primary key, amount integer, taeg real, "
+    "number_repayments integer, start_date text, days_first_repayment integer, "
+    "as_interests_or_base_fees text)"
+)
+conn.executemany(
+    "insert into loans values (?, ?, ?, ?, ?, ?, ?)",
+    zip(
+        range(number_loans),
+        (rng.integers(1, 31, number_loans) * 10000).tolist(),
+        rng.choice([0.0, 0.05, 0.1, 0.2, 0.224], number_loans).tolist(),
+        rng.integers(1, 25, number_loans).tolist(),
+        np.datetime_as_string(
+            np.datetime64("2024-01-01") + rng.integers(0, 366, number_loans)
+        ).tolist(),
+        rng.integers(30, 61, number_loans).tolist(),
+        rng.choice(["interests", "base_fees"], number_loans).tolist(),
+    ),
+)
+query = (
+    "select id, amount, taeg, number_repayments, start_date, days_first_repayment, "
+    "as_interests_or_base_fees from loans"
+)
+print(f"{number_loans} loans, batches of {batch_size} loans")
+
+for rowwise in (False, True):
+    start = time.perf_counter()
+    n_rows = create_loan_calculator_table(
+        conn, query, batch_size=batch_size, rowwise=rowwise, errors="drop"
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'row-wise' if rowwise else 'batched'}: {n_rows} rows in {elapsed:.1f}s "
+        f"({number_loans / elapsed:.0f} loans/s)"
+    )
@@ -0,0 +1,49 @@
+# usage:
+# uv run python scripts/benchmark_long_schedule.py [<number_loans>]
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from loan_calculator import iter_loan_calculator, run_loan_calculator  # noqa: E402
+
+number_loans = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+# synthetic mortgages, of 1000 € to 1 M€ at 0.5 % to 4 %
+rng = random.Random(0)
+print(f"{number_loans} loans per number of repayments")
+for number_repayments in (12, 120, 240, 360, 480, 600):
+    loans = [
+        (
+            rng.randrange(100_000, 100_000_000),
+            rng.uniform(0.005, 0.04),
+            number_repayments,
+            date(2024, 1, 1) + timedelta(days=rng.randrange(366)),
+            rng.randrange(15, 31),
+            rng.choice(["interests", "base_fees"]),
+        )
+        for _ in range(number_loans)
+    ]
+    results = []
+    for name, compute in [
+        ("run_loan_calculator", run_loan_calculator),
+        # schedules are consumed as they come, like when written out
+        ("iter_loan_calculator", lambda *loan: deque(iter_loan_calculator(*loan), 0)),
+    ]:
+        start = time.perf_counter()
+        for loan in loans:
+            compute(*loan)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        compute(*loans[0])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results.append(
+            f"{name} {number_loans / elapsed:.0f} loans/s, peak {peak / 1024:.0f} KiB"
+        )
+    print(f"{number_repayments} repayments: " + ", ".join(results))
@@ -1,11 +1,11 @@
 # Streamlit app
 from datetime import date
 
-import pandas as pd
 import streamlit as st
 from pyxirr import xirr
 
-from loan_calculator import TooHighInterestsError, run_loan_calculator
+from loan_calculator import TooHighInterestsError
+from loan_portfolio import run_portfolio_calculator
 
 st.set_page_config(page_title="Loan calculator")
 st.title("Loan Calculator")
@@ -43,19 +43,18 @@ if st.button("Compute repayment schedule"):
         "interests" if as_interests_or_base_fees == "Interests" else "base_fees"
     )
     try:
-        repayment_schedule = run_loan_calculator(
+        df = run_portfolio_calculator(
             amount_principal * 100,
             taeg / 100,
             number_repayments,
             start_date,
             days_first_repayment,
             as_interests_or_base_fees,
-        )
+        ).to_pandas(in_euros=True, short_names=True)
     except TooHighInterestsError:
         st.error("The interests are too high, please modify loan parameters.")
         st.stop()
-    df = pd.DataFrame(repayment_schedule)
-    df.columns = [c.replace("amount_", "") for c in df.columns]
+    df = df.drop(columns="loan_id")
     num_cols = [
         "repayment",
         "principal",
@@ -63,10 +62,11 @@ if st.button("Compute repayment schedule"):
         "base_fees",
         "remaining_principal",
     ]
-    df[num_cols] = df[num_cols] / 100
     df.index += 1
     st.dataframe(
-        df.style.format("{:.2f}", subset=num_cols),
+        df.style.format("{:.2f}", subset=num_cols).format(
+            "{:%Y-%m-%d}", subset=["date"]
+        ),
         use_container_width=True,
     )
     total_fees = df["base_fees"].sum() + df["interests"].sum()
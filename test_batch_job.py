@@ -0,0 +1,109 @@
+import json
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from batch_job import load_manifest, read_schedules, run_batch_job
+from loan_portfolio import run_portfolio_calculator
+
+LOANS = pd.DataFrame(
+    {
+        "loan_id": [f"loan-{i}" for i in range(10)],
+        "amount": [10000, 60000, 150000, 300000, 50, 123456, 2000, 90000, 10000, 500],
+        "taeg": [0.209, 0.224, 0.2144, 0.9, 0.1, 0.05, 0.0, 0.3, 0.209, 0.1],
+        "number_repayments": [3, 6, 12, 24, 3, 24, 1, 9, 3, 2],
+        "start_date": ["2022-06-01"] * 5 + ["2024-02-29"] * 5,
+        "days_first_repayment": [45, 37, 42, 60, 45, 31, 30, 50, 45, 30],
+    }
+)
+
+
+def write_partitions(input_dir):
+    input_dir.mkdir()
+    LOANS.iloc[:4].to_csv(input_dir / "part-0.csv", index=False)
+    LOANS.iloc[4:7].to_csv(input_dir / "part-1.csv", index=False)
+    LOANS.iloc[7:].to_parquet(input_dir / "part-2.parquet", index=False)
+    LOANS.iloc[:0].to_csv(input_dir / "part-3.csv", index=False)
+
+
+def test_batch_job(tmp_path):
+    write_partitions(tmp_path / "input")
+    logs = []
+
+    manifest = run_batch_job(
+        tmp_path / "input",
+        tmp_path / "output",
+        workers=2,
+        chunk_size=2,
+        log=logs.append,
+    )
+
+    assert sorted(manifest["partitions"]) == [
+        "part-0.csv",
+        "part-1.csv",
+        "part-2.parquet",
+        "part-3.csv",
+    ]
+    assert manifest["partitions"]["part-0.csv"]["loans"] == 4
+    # 300000 cents at 90% and 50 cents are dropped
+    assert sum(p["dropped"] for p in manifest["partitions"].values()) == 2
+    assert "ETA" in logs[-1]
+    assert any("rows/s" in line for line in logs)
+
+    valid = LOANS.drop(index=[3, 4])
+    expected = run_portfolio_calculator(
+        valid["amount"],
+        valid["taeg"],
+        valid["number_repayments"],
+        valid["start_date"],
+        valid["days_first_repayment"],
+        loan_id=valid["loan_id"],
+    ).to_arrow()
+    assert read_schedules(tmp_path / "output").equals(expected)
+
+
+def test_batch_job_resumes(tmp_path):
+    write_partitions(tmp_path / "input")
+    run_batch_job(tmp_path / "input", tmp_path / "output", workers=1, log=print)
+    output_path = tmp_path / "output" / "part-1.csv.parquet"
+    mtime = output_path.stat().st_mtime_ns
+
+    # crash before part-2 was checkpointed, and part-0 has changed since
+    manifest = load_manifest(tmp_path / "output")
+    del manifest["partitions"]["part-2.parquet"]
+    (tmp_path / "output" / "_manifest.json").write_text(json.dumps(manifest))
+    LOANS.iloc[:2].to_csv(tmp_path / "input" / "part-0.csv", index=False)
+    logs = []
+
+    manifest = run_batch_job(
+        tmp_path / "input", tmp_path / "output", workers=1, log=logs.append
+    )
+
+    assert logs[0] == "2 partitions to compute, 2 already done"
+    assert output_path.stat().st_mtime_ns == mtime
+    assert manifest["partitions"]["part-0.csv"]["loans"] == 2
+    assert pq.read_table(tmp_path / "output" / "part-0.csv.parquet").num_rows == 9
+    assert not list((tmp_path / "output").glob(".*"))
+
+
+def test_batch_job_malformed_values(tmp_path):
+    (tmp_path / "input").mkdir()
+    loans = LOANS.iloc[:3].astype(str)
+    loans.loc[0, "start_date"] = "2022-13-01"
+    loans.loc[1, "amount"] = "abc"
+    loans.to_csv(tmp_path / "input" / "part-0.csv", index=False)
+    # same stem, written to another output partition
+    LOANS.iloc[:3].to_parquet(tmp_path / "input" / "part-0.parquet", index=False)
+    # unreadable partition, failed without stopping the others
+    (tmp_path / "input" / "part-1.parquet").write_text("not parquet")
+    logs = []
+
+    manifest = run_batch_job(
+        tmp_path / "input", tmp_path / "output", workers=2, log=logs.append
+    )
+
+    assert sorted(manifest["partitions"]) == ["part-0.csv", "part-0.parquet"]
+    assert manifest["partitions"]["part-0.csv"]["dropped"] == 2
+    assert manifest["partitions"]["part-0.parquet"]["dropped"] == 0
+    assert logs[-1] == "1 partitions failed: part-1.parquet"
+    assert read_schedules(tmp_path / "output").num_rows == 12 + 3 + 6 + 12
@@ -4,7 +4,11 @@ from datetime import date
 import pytest
 from pyxirr import xirr
 
-from loan_calculator import TooHighInterestsError, run_loan_calculator
+from loan_calculator import (
+    TooHighInterestsError,
+    iter_loan_calculator,
+    run_loan_calculator,
+)
 
 
 @pytest.mark.parametrize(
@@ -455,3 +459,27 @@ def test_too_high_interests_error():
             days_first_repayment=60,
             as_interests_or_base_fees="interests",
         )
+
+
+@pytest.mark.parametrize("as_interests_or_base_fees", ["interests", "base_fees"])
+@pytest.mark.parametrize(
+    "loan",
+    [
+        (10000, 0.209, 3, date(2022, 6, 1), 45),
+        (150000, 0.2144, 12, date(2021, 3, 30), 42),
+        (300000, 0.0, 24, date(2024, 1, 31), 30),
+        (123456, 0.9, 1, date(2024, 2, 29), 60),
+        (25000000, 0.035, 300, date(2024, 8, 31), 31),
+        (40000000, 0.02, 600, date(2023, 12, 30), 20),
+    ],
+)
+def test_iter_loan_calculator(loan, as_interests_or_base_fees):
+    assert list(iter_loan_calculator(*loan, as_interests_or_base_fees)) == (
+        run_loan_calculator(*loan, as_interests_or_base_fees)
+    )
+
+
+def test_iter_loan_calculator_too_high_interests_error():
+    repayments = iter_loan_calculator(300000, 0.90, 24, date(2022, 6, 1), 60)
+    with pytest.raises(TooHighInterestsError):
+        list(repayments)
@@ -0,0 +1,62 @@
+from dataclasses import astuple
+from datetime import date
+
+import pytest
+
+from loan_calculator import (
+    TooHighInterestsError,
+    apply_base_fees,
+    run_loan_calculator,
+)
+from loan_calculator_batch import run_loan_calculator_batch
+
+LOANS = [
+    (10000, 0.209, 3, date(2022, 6, 1), 45),
+    (60000, 0.224, 6, date(2024, 9, 24), 37, "base_fees"),
+    (150000, 0.2144, 12, "2021-03-30", 42),
+    (300000, 0.0, 24, date(2024, 1, 31), 30, "interests"),
+] * 5
+
+
+def expected_schedule(loan):
+    return tuple(astuple(r) for r in run_loan_calculator(*loan))
+
+
+@pytest.mark.parametrize(
+    ("workers", "executor"), [(None, "threads"), (3, "threads"), (2, "processes")]
+)
+def test_loan_calculator_batch(workers, executor):
+    schedules = run_loan_calculator_batch(
+        LOANS, workers=workers, executor=executor, chunk_size=3
+    )
+    assert schedules == [expected_schedule(loan) for loan in LOANS]
+
+
+def test_loan_calculator_batch_errors():
+    loans = [
+        LOANS[0],
+        (300000, 0.90, 24, date(2022, 6, 1), 60),
+        (50, 0.209, 3, date(2022, 6, 1)),
+    ]
+    with pytest.raises(TooHighInterestsError):
+        run_loan_calculator_batch(loans, workers=2)
+
+    schedules = run_loan_calculator_batch(loans, workers=2, errors="drop")
+    assert schedules[0] == expected_schedule(LOANS[0])
+    assert schedules[1:] == [None, None]
+
+
+def test_apply_base_fees_copies_repayments():
+    repayments = run_loan_calculator(*LOANS[0])
+    before = [astuple(r) for r in repayments]
+    base_fees = apply_base_fees(repayments, LOANS[0][0])
+    assert [astuple(r) for r in repayments] == before
+    assert base_fees == run_loan_calculator(*LOANS[0], "base_fees")
+
+
+def test_loan_calculator_batch_immutable():
+    (schedule,) = run_loan_calculator_batch(LOANS[:1])
+    assert schedule[0].amount_repayment == 3467
+    with pytest.raises(AttributeError):
+        schedule[0].amount_repayment = 0
+    assert schedule == expected_schedule(LOANS[0])
@@ -0,0 +1,96 @@
+import sqlite3
+
+import pytest
+
+from loan_calculator import TooHighInterestsError
+from loan_calculator_sqlite import create_loan_calculator_table
+
+LOANS = [
+    ("a", 10000, 0.209, 3, "2022-06-01", 45, "interests"),
+    ("b", 60000, 0.224, 6, "2024-09-24", 37, "base_fees"),
+    ("c", 300000, 0.90, 24, "2022-06-01", 60, "interests"),
+    ("d", 150000, 0.2144, 12, "2021-03-30", 42, "base_fees"),
+]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "create table loans (id, amount, taeg, number_repayments, start_date, "
+        "days_first_repayment, as_interests_or_base_fees)"
+    )
+    conn.executemany("insert into loans values (?, ?, ?, ?, ?, ?, ?)", LOANS)
+    return conn
+
+
+@pytest.mark.parametrize("rowwise", [False, True])
+def test_loan_calculator_table(conn, rowwise):
+    n_rows = create_loan_calculator_table(
+        conn,
+        "select * from loans where id != ?",
+        ("c",),
+        batch_size=2,
+        rowwise=rowwise,
+    )
+
+    assert n_rows == 21
+    rows = conn.execute(
+        "select l.id, s.date, s.amount_repayment, s.amount_base_fees "
+        "from loans l join loan_calculator s on s.loan_id = l.id "
+        "where s.amount_base_fees > 0 or l.id = 'a' order by l.id, s.date"
+    ).fetchall()
+    assert rows == [
+        ("a", "2022-07-16", 3467, 0),
+        ("a", "2022-08-16", 3467, 0),
+        ("a", "2022-09-16", 3466, 0),
+        ("b", "2024-10-31", 10639, 3834),
+        ("d", "2021-05-11", 13957, 13957),
+        ("d", "2021-06-11", 13957, 3525),
+    ]
+
+
+@pytest.mark.parametrize("rowwise", [False, True])
+def test_loan_calculator_table_errors(conn, rowwise):
+    with pytest.raises(TooHighInterestsError):
+        create_loan_calculator_table(conn, "select * from loans", rowwise=rowwise)
+
+    create_loan_calculator_table(
+        conn, "select * from loans", rowwise=rowwise, errors="drop"
+    )
+    loan_ids = conn.execute("select distinct loan_id from loan_calculator").fetchall()
+    assert sorted(loan_ids) == [("a",), ("b",), ("d",)]
+
+
+@pytest.mark.parametrize("rowwise", [False, True])
+def test_loan_calculator_table_null_mode(conn, rowwise):
+    conn.execute("update loans set as_interests_or_base_fees = null where id = 'b'")
+    query = "select * from loans where id != 'c'"
+    with pytest.raises(ValueError):
+        create_loan_calculator_table(conn, query, rowwise=rowwise)
+
+    create_loan_calculator_table(conn, query, rowwise=rowwise, errors="drop")
+    loan_ids = conn.execute("select distinct loan_id from loan_calculator").fetchall()
+    assert sorted(loan_ids) == [("a",), ("d",)]
+
+
+@pytest.mark.parametrize("rowwise", [False, True])
+@pytest.mark.parametrize(
+    "column, value",
+    [
+        ("start_date", "2024-13-24"),
+        ("amount", None),
+        ("taeg", None),
+        ("number_repayments", None),
+        ("days_first_repayment", None),
+    ],
+)
+def test_loan_calculator_table_malformed_values(conn, rowwise, column, value):
+    conn.execute(f"update loans set {column} = ? where id = 'b'", (value,))
+    query = "select * from loans where id != 'c'"
+    with pytest.raises((ValueError, TypeError)):
+        create_loan_calculator_table(conn, query, rowwise=rowwise)
+
+    create_loan_calculator_table(conn, query, rowwise=rowwise, errors="drop")
+    loan_ids = conn.execute("select distinct loan_id from loan_calculator").fetchall()
+    assert sorted(loan_ids) == [("a",), ("d",)]
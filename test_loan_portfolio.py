@@ -0,0 +1,129 @@
+from dataclasses import astuple
+from datetime import date
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from loan_calculator import TooHighInterestsError, apply_base_fees, run_loan_calculator
+from loan_portfolio import apply_portfolio_base_fees, run_portfolio_calculator
+
+LOANS = [
+    (10000, 0.209, 3, date(2022, 6, 1), 45),
+    (60000, 0.224, 6, date(2024, 9, 24), 37),
+    (150000, 0.2144, 12, date(2021, 3, 30), 42),
+    (300000, 0.0, 24, date(2024, 1, 31), 30),
+    (123456, 0.9, 1, date(2024, 2, 29), 60),
+    (250000, 0.05, 24, date(2023, 12, 31), 31),
+]
+
+
+@pytest.mark.parametrize("as_interests_or_base_fees", ["interests", "base_fees"])
+def test_portfolio_calculator_matches_loan_calculator(as_interests_or_base_fees):
+    amount, taeg, number_repayments, start_date, days_first_repayment = zip(*LOANS)
+    schedule = run_portfolio_calculator(
+        amount,
+        taeg,
+        number_repayments,
+        start_date,
+        days_first_repayment,
+        as_interests_or_base_fees,
+        loan_id=["a", "b", "c", "d", "e", "f"],
+    )
+
+    expected = [
+        (loan_id, *astuple(r))
+        for loan_id, loan in zip("abcdef", LOANS)
+        for r in run_loan_calculator(
+            *loan, as_interests_or_base_fees=as_interests_or_base_fees
+        )
+    ]
+    df = schedule.to_pandas()
+    df["date"] = df["date"].dt.date
+    assert list(df.itertuples(index=False, name=None)) == expected
+    assert schedule.offsets.tolist() == [0, 3, 9, 21, 45, 46, 70]
+
+
+def test_portfolio_calculator_outputs():
+    schedule = run_portfolio_calculator(10000, 0.209, 3, "2022-06-01")
+
+    df = schedule.to_pandas(in_euros=True, short_names=True)
+    assert list(df.columns) == [
+        "loan_id",
+        "date",
+        "repayment",
+        "principal",
+        "interests",
+        "base_fees",
+        "remaining_principal",
+    ]
+    assert df["repayment"].tolist() == [34.67, 34.67, 34.66]
+    assert df["date"].dtype.kind == "M"
+
+    table = schedule.to_arrow()
+    assert table.schema.field("date").type == pa.date32()
+    assert table.schema.field("amount_repayment").type == pa.int64()
+    assert table.column("date").to_pylist() == [
+        date(2022, 7, 16),
+        date(2022, 8, 16),
+        date(2022, 9, 16),
+    ]
+
+
+def test_portfolio_calculator_errors():
+    amount = [300000, 10000, 50]
+    taeg = [0.90, 0.209, 0.209]
+    with pytest.raises(TooHighInterestsError):
+        run_portfolio_calculator(amount[:2], taeg[:2], 24, date(2022, 6, 1), 60)
+    with pytest.raises(ValueError):
+        run_portfolio_calculator(amount, taeg, 24, date(2022, 6, 1), 60)
+
+    schedule = run_portfolio_calculator(
+        amount, taeg, 24, date(2022, 6, 1), 60, errors="drop"
+    )
+    assert np.unique(schedule.loan_id).tolist() == [1]
+    assert len(schedule) == 24
+
+    with pytest.raises(ValueError, match="at most 1200"):
+        run_portfolio_calculator(10000, 0.209, 10**7, date(2022, 6, 1))
+
+
+def test_portfolio_calculator_mixed_lengths():
+    # loans of 12 repayments around long and invalid ones, computed by groups
+    number_repayments = [12, 600, 12, 10**7, 1, 12, 300]
+    schedule = run_portfolio_calculator(
+        300000, 0.05, number_repayments, date(2024, 1, 31), 30, errors="drop"
+    )
+
+    assert schedule.loan_id[schedule.offsets[:-1]].tolist() == [0, 1, 2, 4, 5, 6]
+    assert np.diff(schedule.offsets).tolist() == [12, 600, 12, 1, 12, 300]
+    df = schedule.to_pandas()
+    df["date"] = df["date"].dt.date
+    expected = [
+        (loan_id, *astuple(r))
+        for loan_id, n in enumerate(number_repayments)
+        if n != 10**7
+        for r in run_loan_calculator(300000, 0.05, n, date(2024, 1, 31), 30)
+    ]
+    assert list(df.itertuples(index=False, name=None)) == expected
+
+
+def test_apply_portfolio_base_fees():
+    amount, taeg, number_repayments, start_date, days_first_repayment = zip(*LOANS)
+    schedule = run_portfolio_calculator(
+        amount, taeg, number_repayments, start_date, days_first_repayment
+    )
+    interests = schedule.amount_interests.copy()
+
+    base_fees_schedule = apply_portfolio_base_fees(schedule, amount)
+
+    expected = [
+        astuple(r)[1:]
+        for loan in LOANS
+        for r in apply_base_fees(run_loan_calculator(*loan), loan[0])
+    ]
+    df = base_fees_schedule.to_pandas().drop(columns=["loan_id", "date"])
+    assert list(df.itertuples(index=False, name=None)) == expected
+    # fees of the 150000 cents loan span its first two repayments
+    assert base_fees_schedule.amount_base_fees[9:12].tolist() == [13957, 3525, 0]
+    np.testing.assert_array_equal(schedule.amount_interests, interests)
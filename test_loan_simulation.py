@@ -0,0 +1,83 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from pyxirr import xirr as pyxirr
+
+from loan_portfolio import run_portfolio_calculator
+from loan_simulation import simulate_portfolio, xirr
+
+AMOUNT = [10000, 60000, 150000]
+TAEG = [0.209, 0.224, 0.2144]
+NUMBER_REPAYMENTS = [3, 6, 12]
+START_DATE = [date(2022, 6, 1), date(2024, 9, 24), date(2021, 3, 30)]
+DAYS_FIRST_REPAYMENT = [45, 37, 42]
+
+
+@pytest.fixture
+def schedule():
+    return run_portfolio_calculator(
+        AMOUNT, TAEG, NUMBER_REPAYMENTS, START_DATE, DAYS_FIRST_REPAYMENT
+    )
+
+
+def test_xirr_matches_pyxirr():
+    days = np.array([45, 76, 106, 137])
+    cashflows = np.array([[3467, 3467, 3466, 0], [3467, 7000, 0, 0], [0, 0, 0, 0]])
+
+    rates = xirr(np.array(10000), cashflows, days)
+
+    for cashflow, rate in zip(cashflows[:2], rates):
+        expected = pyxirr(
+            [date(2022, 6, 1), *np.datetime64("2022-06-01") + days],
+            [-10000, *cashflow],
+        )
+        assert rate == pytest.approx(expected, abs=1e-9)
+    assert rates[2] == -1
+
+
+def test_simulation_without_events(schedule):
+    result = simulate_portfolio(schedule, START_DATE, n_scenarios=10)
+
+    np.testing.assert_array_equal(result.expected_cashflows, schedule.amount_repayment)
+    assert result.loans["default_probability"].tolist() == [0, 0, 0]
+    assert result.loans["xirr_p50"].to_numpy() == pytest.approx(TAEG, abs=0.01)
+
+
+def test_simulation_with_certain_default(schedule):
+    result = simulate_portfolio(
+        schedule, START_DATE, n_scenarios=10, default_rate=1.0, recovery_rate=0.5
+    )
+
+    assert result.loans["default_probability"].tolist() == [1, 1, 1]
+    assert result.loans["expected_cashflows"].tolist() == [5000, 30000, 75000]
+    assert (result.loans["xirr_p95"] < 0).all()
+
+
+def test_simulation_is_reproducible(schedule):
+    kwargs = dict(
+        n_scenarios=500,
+        prepayment_rate=0.05,
+        default_rate=0.02,
+        recovery_rate=0.3,
+        percentiles=(1, 50),
+        seed=42,
+        chunk_size=1,
+    )
+
+    result = simulate_portfolio(schedule, START_DATE, workers=1, **kwargs)
+    parallel_result = simulate_portfolio(schedule, START_DATE, workers=2, **kwargs)
+
+    assert list(result.loans.columns) == [
+        "loan_id",
+        "default_probability",
+        "prepayment_probability",
+        "expected_cashflows",
+        "xirr_p1",
+        "xirr_p50",
+    ]
+    assert result.loans.equals(parallel_result.loans)
+    np.testing.assert_array_equal(
+        result.expected_cashflows, parallel_result.expected_cashflows
+    )
+    assert (result.loans["prepayment_probability"] > 0).all()
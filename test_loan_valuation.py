@@ -0,0 +1,69 @@
+import math
+from bisect import bisect_right
+from datetime import date, timedelta
+
+import pytest
+
+from loan_calculator import compute_interval_rate, run_loan_calculator
+from loan_portfolio import run_portfolio_calculator
+from loan_valuation import ValuationIndex
+
+LOANS = [
+    (10000, 0.209, 3, date(2022, 6, 1), 45),
+    (60000, 0.224, 6, date(2022, 6, 10), 37),
+    (150000, 0.2144, 12, date(2021, 3, 30), 42),
+]
+
+
+def value_loan(loan, as_of_date):
+    amount, taeg, number_repayments, start_date, days_first_repayment = loan
+    repayments = run_loan_calculator(*loan)
+    paid = bisect_right([r.date for r in repayments], as_of_date)
+    if as_of_date < start_date or paid == len(repayments):
+        return 0, 0
+    if paid == 0:
+        outstanding, last_date = amount, start_date
+    else:
+        outstanding = repayments[paid - 1].amount_remaining_principal
+        last_date = repayments[paid - 1].date
+    n_days = (as_of_date - last_date).days
+    return outstanding, math.floor(outstanding * compute_interval_rate(taeg, n_days))
+
+
+def test_valuation_index():
+    amount, taeg, number_repayments, start_date, days_first_repayment = zip(*LOANS)
+    schedule = run_portfolio_calculator(
+        amount, taeg, number_repayments, start_date, days_first_repayment
+    )
+    as_of_dates = [date(2021, 3, 1) + timedelta(days=d) for d in range(0, 600, 7)]
+
+    valuation = ValuationIndex(schedule, taeg, start_date).value(as_of_dates)
+
+    expected = [
+        (as_of_date, loan_id, *value_loan(loan, as_of_date))
+        for as_of_date in as_of_dates
+        for loan_id, loan in enumerate(LOANS)
+    ]
+    valuation["as_of_date"] = valuation["as_of_date"].dt.date
+    assert list(valuation.itertuples(index=False, name=None)) == expected
+
+
+@pytest.mark.parametrize(
+    ("as_of_date", "expected"),
+    [
+        (date(2022, 7, 15), (10000, 231)),
+        (date(2022, 7, 16), (6769, 0)),
+        (date(2022, 8, 1), (6769, 56)),
+    ],
+)
+def test_valuation_index_base_fees(as_of_date, expected):
+    interests = run_portfolio_calculator(10000, 0.209, 3, date(2022, 6, 1))
+    base_fees = run_portfolio_calculator(
+        10000, 0.209, 3, date(2022, 6, 1), as_interests_or_base_fees="base_fees"
+    )
+
+    valuation = ValuationIndex(interests, 0.209, date(2022, 6, 1)).value(as_of_date)
+    assert tuple(valuation.iloc[0, 2:]) == expected
+
+    valuation = ValuationIndex(base_fees, 0.209, date(2022, 6, 1)).value(as_of_date)
+    assert valuation["amount_accrued_interests"].tolist() == [0]
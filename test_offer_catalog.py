@@ -0,0 +1,74 @@
+from datetime import date
+from unittest import mock
+
+import pytest
+
+from loan_calculator import TooHighInterestsError, run_loan_calculator
+from offer_catalog import OfferCatalog
+
+TAEGS = [0.1, 0.224, 0.9]
+
+
+@pytest.mark.parametrize("as_interests_or_base_fees", ["interests", "base_fees"])
+def test_offer_catalog(as_interests_or_base_fees):
+    catalog = OfferCatalog(
+        TAEGS, as_interests_or_base_fees, start_date=date(2024, 1, 31)
+    )
+
+    for amount in (10000, 150000, 300000):
+        for taeg in TAEGS:
+            for number_repayments in (1, 6, 24):
+                for days_first_repayment in (30, 45, 60):
+                    args = (
+                        amount,
+                        taeg,
+                        number_repayments,
+                        date(2024, 1, 31),
+                        days_first_repayment,
+                    )
+                    try:
+                        expected = run_loan_calculator(*args, as_interests_or_base_fees)
+                    except TooHighInterestsError:
+                        with pytest.raises(TooHighInterestsError):
+                            catalog.quote(*args)
+                        continue
+                    with mock.patch("offer_catalog.run_loan_calculator") as fallback:
+                        assert catalog.quote(*args) == expected
+                    fallback.assert_not_called()
+
+
+def test_offer_catalog_fallback():
+    catalog = OfferCatalog(TAEGS, start_date=date(2024, 1, 31))
+
+    for args in [
+        (12345, 0.1, 6, date(2024, 1, 31), 45),
+        (10000, 0.2, 6, date(2024, 1, 31), 45),
+        (10000, 0.1, 6, date(2024, 2, 1), 45),
+        (10000, 0.1, 6, date(2024, 1, 31), 20),
+    ]:
+        assert catalog.quote(*args) == run_loan_calculator(*args)
+
+
+def test_offer_catalog_rebuild(tmp_path):
+    snapshot_path = tmp_path / "catalog.npz"
+    catalog = OfferCatalog(
+        TAEGS, snapshot_path=snapshot_path, start_date=date(2024, 10, 19)
+    )
+    assert catalog.n_computed_blocks == 3 * 31
+
+    catalog.build(date(2024, 10, 20))
+    # only the offers whose repayment days cross a month end differ
+    assert 0 < catalog.n_computed_blocks < 3 * 31
+    args = (150000, 0.224, 12, date(2024, 10, 20), 45)
+    assert catalog.quote(*args) == run_loan_calculator(*args)
+
+    loaded = OfferCatalog(
+        TAEGS, snapshot_path=snapshot_path, start_date=date(2024, 10, 20)
+    )
+    assert loaded.n_computed_blocks == 0
+    assert loaded.quote(*args) == run_loan_calculator(*args)
+
+    with mock.patch("offer_catalog.date") as mock_date:
+        mock_date.today.return_value = date(2024, 10, 21)
+        loaded.quote(*args[:3])
+    assert loaded.start_date == date(2024, 10, 21)
@@ -0,0 +1,138 @@
+import io
+from dataclasses import astuple
+from datetime import date
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from pyxirr import xirr
+from streamlit.testing.v1 import AppTest
+
+from loan_calculator import run_loan_calculator
+from portfolio_job import PortfolioJob
+
+LOANS = pd.DataFrame(
+    {
+        "loan_id": ["a", "b", "c", "d", "e"],
+        "amount": [10000, 60000, 300000, 50, 150000],
+        "taeg": [0.209, 0.224, 0.9, 0.1, 0.2144],
+        "number_repayments": [3, 6, 24, 3, 12],
+        "start_date": [
+            "2022-06-01",
+            "2024-09-24",
+            "2022-06-01",
+            "2022-06-01",
+            "2021-03-30",
+        ],
+        "days_first_repayment": [45, 37, 60, 45, 42],
+    }
+)
+
+
+@pytest.mark.parametrize("as_interests_or_base_fees", ["interests", "base_fees"])
+def test_portfolio_job(tmp_path, as_interests_or_base_fees):
+    LOANS.to_csv(tmp_path / "loans.csv", index=False)
+    job = PortfolioJob(
+        tmp_path / "loans.csv", tmp_path, as_interests_or_base_fees, chunk_size=2
+    )
+    assert job.total_loans == 5
+
+    job.start()
+    job.join()
+
+    assert job.error is None
+    assert job.finished
+    assert job.progress == 1
+    summary = pd.read_parquet(job.summary_path)
+    assert summary["status"].tolist() == ["ok", "ok", "rejected", "rejected", "ok"]
+
+    schedules = pq.read_table(job.schedules_path).to_pandas()
+    for loan in LOANS.iloc[[0, 1, 4]].itertuples(index=False):
+        repayments = run_loan_calculator(
+            loan.amount,
+            loan.taeg,
+            loan.number_repayments,
+            date.fromisoformat(loan.start_date),
+            loan.days_first_repayment,
+            as_interests_or_base_fees,
+        )
+        rows = schedules[schedules["loan_id"] == loan.loan_id].drop(columns="loan_id")
+        assert list(rows.itertuples(index=False, name=None)) == [
+            astuple(r) for r in repayments
+        ]
+        row = summary.set_index("loan_id").loc[loan.loan_id]
+        assert row["total_repayment"] == sum(r.amount_repayment for r in repayments)
+        assert row["total_fees"] == sum(
+            r.amount_interests + r.amount_base_fees for r in repayments
+        )
+        assert row["xirr"] == pytest.approx(
+            xirr(
+                [loan.start_date, *[r.date for r in repayments]],
+                [-loan.amount, *[r.amount_repayment for r in repayments]],
+            )
+        )
+        assert not row["xirr_above_taeg"]
+
+    # one part per chunk of 2 loans
+    assert job.n_parts == 3
+    parts = [
+        pd.read_csv(io.BytesIO(job.schedules_part(part, "csv"))) for part in range(3)
+    ]
+    assert [len(part) for part in parts] == [9, 0, 12]
+    assert pq.read_table(io.BytesIO(job.schedules_part(2))).equals(
+        pq.read_table(job.schedules_path).slice(9)
+    )
+
+
+def test_portfolio_page():
+    app = AppTest.from_file("pages/portfolio.py").run()
+
+    assert not app.exception
+    assert app.title[0].value == "Portfolio"
+
+
+def test_portfolio_job_malformed_values(tmp_path):
+    loans = LOANS.astype(str)
+    loans.loc[0, "start_date"] = "2022-13-01"
+    loans.loc[2, "taeg"] = "abc"
+    loans.loc[4, "amount"] = ""
+    loans.to_csv(tmp_path / "loans.csv", index=False)
+    job = PortfolioJob(tmp_path / "loans.csv", tmp_path, chunk_size=2)
+
+    job.start()
+    job.join()
+
+    assert job.error is None
+    summary = pd.read_parquet(job.summary_path)
+    assert (
+        summary["status"].tolist() == ["rejected", "ok", "rejected"] + ["rejected"] * 2
+    )
+    assert pq.read_table(job.schedules_path).num_rows == 6
+
+
+def results_app(path):
+    from portfolio_job import PortfolioJob
+    from portfolio_results import show_results
+
+    job = PortfolioJob(path, path.parent, chunk_size=2)
+    job.run()
+    show_results(job)
+
+
+def test_portfolio_results(tmp_path):
+    LOANS.to_csv(tmp_path / "loans.csv", index=False)
+    app = AppTest.from_function(
+        results_app, args=(tmp_path / "loans.csv",), default_timeout=30
+    ).run()
+
+    assert not app.exception
+    assert "Loans: 5, rejected: 2" in [m.value for m in app.markdown]
+    assert not app.get("download_button")
+
+    app.selectbox[0].select(2)
+    app.radio[0].set_value("CSV")
+    app.checkbox[0].check().run()
+    assert [b.label for b in app.get("download_button")] == [
+        "Download schedules, part 2 (csv)",
+        "Download summary (CSV)",
+    ]
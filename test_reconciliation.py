@@ -0,0 +1,132 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from loan_portfolio import run_portfolio_calculator
+from reconciliation import ReconciliationEngine
+
+# repayments of 3467, 3467 and 3466 from 2022-07-16, and of 10693 (10692 for the
+# last one) from 2022-07-16
+SCHEDULE = run_portfolio_calculator(
+    [10000, 60000], [0.209, 0.224], [3, 6], date(2022, 6, 1), loan_id=["a", "b"]
+)
+
+
+def test_reconciliation():
+    engine = ReconciliationEngine(SCHEDULE, tolerance_days=3)
+    n_payments = engine.apply_payments(
+        [
+            ("a", "2022-07-18", 3462),
+            ("a", date(2022, 8, 10), 3000),
+            ("b", "2022-07-16", 10000),
+            ("b", "2022-08-30", 30000),
+            ("c", "2022-07-16", 5),
+        ]
+    )
+    status = engine.status("2022-09-01")
+
+    assert n_payments == 5
+    assert (engine.unmatched_payments, engine.unmatched_amount) == (1, 5)
+    assert status.to_dict("records") == [
+        {
+            "loan_id": "a",
+            "amount_due": 6934,
+            "amount_paid": 6462,
+            "amount_arrears": 472,
+            "amount_early": 0,
+            "amount_overpaid": 0,
+            "missed_installments": 0,
+            "partial_installments": 1,
+            "late_installments": 1,
+            "status": "partial",
+        },
+        {
+            "loan_id": "b",
+            "amount_due": 21386,
+            "amount_paid": 40000,
+            "amount_arrears": 0,
+            "amount_early": 18614,
+            "amount_overpaid": 0,
+            "missed_installments": 0,
+            "partial_installments": 0,
+            "late_installments": 2,
+            "status": "early",
+        },
+    ]
+
+
+@pytest.mark.parametrize(
+    ("payments", "as_of_date", "expected"),
+    [
+        ([], date(2022, 7, 19), ("current", 0, 0)),
+        ([], date(2022, 7, 20), ("missed", 3467, 1)),
+        # matched with the second installment, the first one stays missed
+        ([("a", "2022-08-14", 3467)], date(2022, 8, 20), ("missed", 3467, 1)),
+        ([("a", "2022-07-10", 10400)], date(2022, 8, 20), ("closed", 0, 0)),
+        ([("a", "2022-07-10", 10500)], date(2022, 8, 20), ("closed", 0, 0)),
+    ],
+)
+def test_reconciliation_status(payments, as_of_date, expected):
+    engine = ReconciliationEngine(SCHEDULE, tolerance_days=3)
+    engine.apply_payments(payments)
+    status = engine.status(as_of_date).set_index("loan_id").loc["a"]
+    assert (
+        status["status"],
+        status["amount_arrears"],
+        status["missed_installments"],
+    ) == expected
+
+
+def test_reconciliation_overpaid():
+    engine = ReconciliationEngine(SCHEDULE)
+    engine.apply_payments([("a", "2022-07-16", 10000), ("a", "2022-09-16", 500)])
+    status = engine.status(date(2022, 8, 1)).set_index("loan_id").loc["a"]
+    assert (status["status"], status["amount_early"], status["amount_overpaid"]) == (
+        "closed",
+        6933,
+        100,
+    )
+
+
+def test_reconciliation_on_time_within_tolerance():
+    engine = ReconciliationEngine(SCHEDULE, tolerance_days=3)
+    engine.apply_payments([("a", "2022-07-16", 3467)])
+    status = engine.status("2022-07-17").set_index("loan_id").loc["a"]
+    assert (status["status"], status["amount_due"], status["amount_early"]) == (
+        "current",
+        3467,
+        0,
+    )
+
+
+def test_reconciliation_duplicate_loan_ids():
+    schedule = run_portfolio_calculator(
+        [10000, 60000], [0.209, 0.224], [3, 6], date(2022, 6, 1), loan_id=["a", "a"]
+    )
+    with pytest.raises(ValueError):
+        ReconciliationEngine(schedule)
+
+
+def test_reconciliation_malformed_payments():
+    engine = ReconciliationEngine(SCHEDULE, tolerance_days=3)
+    n_payments = engine.apply_payments(
+        [
+            ("a", "2022-07-16", 3467.0),
+            ("a", "2022-08-16", 10.5),
+            ("a", None, 100),
+            ("b", pd.NaT, 100),
+            ("b", np.datetime64("2022-07-16"), np.int64(10693)),
+            ("b", pd.Timestamp("2022-08-16"), None),
+            ("b", "2022-13-16", 100),
+            ("c", "2022-07-16", 5.0),
+        ]
+    )
+    status = engine.status("2022-07-31")
+
+    assert n_payments == 8
+    assert engine.rejected_payments == 5
+    assert (engine.unmatched_payments, engine.unmatched_amount) == (1, 5)
+    assert status["amount_paid"].tolist() == [3467, 10693]
+    assert status["status"].tolist() == ["current", "current"]
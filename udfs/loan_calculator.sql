@@ -24,9 +24,11 @@ as $$
 import calendar
 import json
 import math
+import operator
 from dataclasses import asdict, dataclass
 from datetime import date, timedelta
-from typing import List, Literal, Union
+from itertools import accumulate
+from typing import Iterator, List, Literal, Union
 
 
 @dataclass
@@ -142,24 +144,170 @@ def run_loan_calculator(
 
 
 def apply_base_fees(repayments: List[Repayment], amount: int) -> List[Repayment]:
-    """Transform to the repayment schedule from a interests to base_fees vision."""
+    """Transform to the repayment schedule from a interests to base_fees vision.
+
+    Repayments are copied, not modified, so that schedules can be shared.
+    """
     remaining_principal = amount
     base_fees_remainder = sum(r.amount_interests for r in repayments)
 
+    base_fees_repayments = []
     for r in repayments:
-        r.amount_interests = 0
         if base_fees_remainder > r.amount_repayment:
-            r.amount_base_fees = r.amount_repayment
-            base_fees_remainder -= r.amount_base_fees
+            amount_base_fees = r.amount_repayment
+            base_fees_remainder -= amount_base_fees
         else:
-            r.amount_base_fees = base_fees_remainder
+            amount_base_fees = base_fees_remainder
             base_fees_remainder = 0
 
-        r.amount_principal = r.amount_repayment - r.amount_base_fees
-        remaining_principal -= r.amount_principal
-        r.amount_remaining_principal = remaining_principal
+        amount_principal = r.amount_repayment - amount_base_fees
+        remaining_principal -= amount_principal
+        base_fees_repayments.append(
+            Repayment(
+                date=r.date,
+                amount_repayment=r.amount_repayment,
+                amount_principal=amount_principal,
+                amount_interests=0,
+                amount_base_fees=amount_base_fees,
+                amount_remaining_principal=remaining_principal,
+            )
+        )
+
+    return base_fees_repayments
 
-    return repayments
+
+def iter_loan_calculator(
+    amount: int,
+    taeg: float,
+    number_repayments: int,
+    start_date: date,
+    days_first_repayment: int = 45,
+    as_interests_or_base_fees: Literal["interests", "base_fees"] = "interests",
+) -> Iterator[Repayment]:
+    """Compute a loan repayment schedule lazily, for long loans.
+
+    Same schedule as ``run_loan_calculator``, but repayments are yielded one by
+    one and never stored, so that memory does not depend on the number of
+    repayments. Dates are computed month after month and discount factors are
+    compounded from one repayment to the next, with one power per distinct
+    number of days between repayments, instead of one power over the whole
+    duration for each repayment.
+
+    Dates are iterated twice: once for the constant repayment, once for the
+    repayments, after another one for the total of interests with base fees.
+    As interests, errors of too high interests are raised while iterating,
+    after the repayments before the one concerned.
+
+    Parameters
+    ----------
+    See ``run_loan_calculator``.
+
+    Yields
+    ------
+    Repayment
+        Repayments of the schedule, in order.
+    """
+    if isinstance(start_date, str):
+        start_date = date.fromisoformat(start_date)
+    validate_inputs(
+        amount,
+        taeg,
+        number_repayments,
+        start_date,
+        days_first_repayment,
+        as_interests_or_base_fees,
+        False,
+    )
+    daily_rate = compute_interval_rate(taeg, n_days=1)
+    first_repayment_date = start_date + timedelta(days=days_first_repayment)
+    # the first interval is followed by months of 28 to 31 days
+    n_days_intervals = {days_first_repayment, 28, 29, 30, 31}
+    interval_rates = {n: compute_interval_rate(taeg, n) for n in n_days_intervals}
+    growth_factors = {n: (1 + daily_rate) ** n for n in n_days_intervals}
+
+    def iter_intervals():
+        """Yield the repayment dates, with the days from the previous date."""
+        previous = start_date
+        year, month = first_repayment_date.year, first_repayment_date.month
+        day = first_repayment_date.day
+        for _ in range(number_repayments):
+            # every month has at least 28 days
+            if day <= 28:
+                end = date(year, month, day)
+            else:
+                end = date(year, month, min(day, calendar.monthrange(year, month)[1]))
+            yield end, (end - previous).days
+            previous = end
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    # compute constant amount repayment with respect to the daily rate,
+    # discounting each repayment from the previous one
+    growths = accumulate(
+        (growth_factors[n_days] for _, n_days in iter_intervals()), operator.mul
+    )
+    constant_payment = math.floor(amount / sum(1 / growth for growth in growths))
+
+    def iter_interests():
+        """Yield the repayment dates and interests."""
+        remaining_principal = amount
+        for end, n_days in iter_intervals():
+            repayment_interests = math.floor(
+                remaining_principal * interval_rates[n_days]
+            )
+            if repayment_interests > constant_payment:
+                raise TooHighInterestsError(
+                    "The repayment is too low to cover the interests; please modify loan parameters."
+                )
+            remaining_principal -= constant_payment - repayment_interests
+            yield end, repayment_interests
+
+    if as_interests_or_base_fees == "interests":
+        # hold back each repayment until the next one, to adjust the last one
+        remaining_principal = amount
+        last = None
+        for end, repayment_interests in iter_interests():
+            if last is not None:
+                yield last
+            repayment_principal = constant_payment - repayment_interests
+            remaining_principal -= repayment_principal
+            last = Repayment(
+                date=end,
+                amount_repayment=constant_payment,
+                amount_principal=repayment_principal,
+                amount_interests=repayment_interests,
+                amount_base_fees=0,
+                amount_remaining_principal=remaining_principal,
+            )
+
+        # adjust last repayment to match the remaining principal due to rounding issues
+        last.amount_repayment += remaining_principal
+        last.amount_principal += remaining_principal
+        last.amount_remaining_principal = 0
+        yield last
+        return
+
+    # with base fees, only the total of interests matters, see apply_base_fees,
+    # and the last repayment is adjusted to repay the amount with them
+    base_fees_remainder = sum(interests for _, interests in iter_interests())
+    last_repayment = (
+        amount + base_fees_remainder - constant_payment * (number_repayments - 1)
+    )
+    remaining_principal = amount
+    for i, (end, _) in enumerate(iter_intervals(), 1):
+        amount_repayment = (
+            last_repayment if i == number_repayments else constant_payment
+        )
+        amount_base_fees = min(base_fees_remainder, amount_repayment)
+        base_fees_remainder -= amount_base_fees
+        remaining_principal -= amount_repayment - amount_base_fees
+        yield Repayment(
+            date=end,
+            amount_repayment=amount_repayment,
+            amount_principal=amount_repayment - amount_base_fees,
+            amount_interests=0,
+            amount_base_fees=amount_base_fees,
+            amount_remaining_principal=remaining_principal,
+        )
 
 
 def compute_interval_rate(taeg: float, n_days: int) -> float: